@@ -1,15 +1,28 @@
+import time
+_import_started = time.perf_counter()
+
 import os
 import sys
+import gzip
+import json
+import asyncio
+import hashlib
 import logging
 import traceback
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Union
 import uvicorn
-import pickle
-import pandas as pd
+
+# pandas/numpy/xgboost are imported lazily when the predictor is built
+# (see load_predictor) so importing the app stays cheap.
+from src.pipeline.batcher import MicroBatcher
+from src.pipeline.metrics import REGISTRY, STAGE_SECONDS, REQUEST_SECONDS, REQUESTS, STARTUP_SECONDS
 
 # Configure Logging
 logging.basicConfig(
@@ -19,7 +32,201 @@ logging.basicConfig(
 )
 logger = logging.getLogger("f1_api")
 
-app = FastAPI(title="F1 2026 Prediction API")
+# --- INITIALIZATION ---
+base_dir = os.path.dirname(os.path.abspath(__file__))
+model_path = os.path.join(base_dir, "src", "models", "xgb_winner_model.json")
+if not os.path.exists(model_path):
+    model_path = os.path.join(base_dir, "src", "models", "xgb_winner_model.pkl")
+features_path = os.path.join(base_dir, "data", "features", "final_features.parquet")
+if not os.path.exists(features_path):
+    features_path = os.path.join(base_dir, "data", "features", "final_features.csv")
+model_path = os.getenv("MODEL_PATH", model_path)
+features_path = os.getenv("FEATURES_PATH", features_path)
+# Map features from an Arrow export shared between processes (set by src/pipeline/serve.py)
+share_features = os.getenv("SHARE_FEATURES", "0") == "1"
+races_path = os.path.join(base_dir, "data", "raw", "races.csv")
+
+# Opt-in profiling: with PROFILING_ENABLED=1, a prediction request sent
+# with "X-Profile: 1" is profiled and the collapsed stacks are written to
+# PROFILE_DIR; the response names the file in X-Profile-Artifact.
+profiling_enabled = os.getenv("PROFILING_ENABLED", "0") == "1"
+profile_dir = os.getenv("PROFILE_DIR", os.path.join(base_dir, "data", "profiles"))
+
+# Versioned model registry (see src/pipeline/registry.py). When set, the
+# active version is loaded from it, polled for changes and hot-swapped.
+registry_dir = os.getenv("MODEL_REGISTRY_DIR")
+registry_poll_s = float(os.getenv("MODEL_REGISTRY_POLL_S", 5))
+
+# Set once the predictor is loaded and warmed up
+predictor = None
+batcher = None
+manager = None
+# (snapshot, {name: StaticBody}) for the metadata endpoints
+metadata_cache = None
+# (races.csv signature, calendar DataFrame) for /predict/season
+calendar_cache = None
+startup = {'status': 'starting', 'error': None, 'timings': {}}
+
+def score_races(race_inputs):
+    predictor.refresh_if_stale()
+    return predictor.predict_many(race_inputs)
+
+def predict_one(p, race_input, as_of=None):
+    p.refresh_if_stale()
+    return p.predict(race_input, as_of)
+
+def predict_uncached(p, race_input, as_of=None):
+    p.refresh_if_stale()
+    return p._predict(race_input, as_of)
+
+def warm_up(p):
+    """Runs one inference so the first real request doesn't pay for it."""
+    drivers = p.get_drivers()[:2]
+    constructors = p.get_constructors()[:2]
+    location = p.get_locations()[0]
+    grid = [
+        {'driverId': d, 'constructorId': c, 'grid': i + 1, 'Location': location}
+        for i, (d, c) in enumerate(zip(drivers, constructors))
+    ]
+    p.score(grid)
+    p.predict_many([grid, grid])
+
+def build_predictor(model_path, features_path, timings=None):
+    """Builds a predictor and warms it up, optionally recording load/warm-up times."""
+    from src.pipeline.predict import F1Predictor
+    timings = {} if timings is None else timings
+    started = time.perf_counter()
+    p = F1Predictor(
+        model_path, features_path,
+        cache_size=int(os.getenv("PREDICTION_CACHE_SIZE", 1024)),
+        cache_ttl=float(os.getenv("PREDICTION_CACHE_TTL", 300)),
+        evaluator=os.getenv("MODEL_EVALUATOR", "xgboost"),
+        share_features=share_features,
+    )
+    timings['load_s'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    warm_up(p)
+    timings['warmup_s'] = time.perf_counter() - started
+    return p
+
+def load_predictor():
+    """Imports the model stack, builds the predictor and warms it up."""
+    global predictor, batcher, manager
+    if predictor is not None:
+        return  # preloaded before the worker was forked (src/pipeline/serve.py)
+    timings = startup['timings']
+    try:
+        started = time.perf_counter()
+        from src.pipeline.predict import F1Predictor
+        timings['import_s'] = time.perf_counter() - started
+
+        if registry_dir:
+            from src.pipeline.registry import ModelRegistry, ModelManager
+            started = time.perf_counter()
+            manager = ModelManager(ModelRegistry(registry_dir), build_predictor)
+            manager.sync()
+            p = manager.current()
+            if p is None:
+                raise RuntimeError(f"No active model version in {registry_dir}")
+            timings['load_s'] = time.perf_counter() - started
+            logger.info(f"Serving model version {manager.active} from {registry_dir}")
+        else:
+            p = build_predictor(model_path, features_path, timings)
+
+        # Micro-batching of concurrent /predict calls (off unless PREDICT_BATCH_WAIT_MS > 0)
+        batch_wait_ms = float(os.getenv("PREDICT_BATCH_WAIT_MS", 0))
+        if batch_wait_ms > 0:
+            batcher = MicroBatcher(
+                score_races,
+                max_wait_ms=batch_wait_ms,
+                max_rows=int(os.getenv("PREDICT_BATCH_MAX_ROWS", 512)),
+            )
+            logger.info(f"Micro-batching /predict: wait {batch_wait_ms} ms, max {batcher.max_rows} rows.")
+
+        predictor = p
+        metadata_bodies()
+        startup['status'] = 'ready'
+        for phase, seconds in timings.items():
+            STARTUP_SECONDS.set(seconds, phase)
+        logger.info(f"Predictor initialized successfully: {timings}")
+    except Exception as e:
+        startup['status'] = 'failed'
+        startup['error'] = str(e)
+        logger.error(f"Failed to initialize predictor: {e}")
+        traceback.print_exc()
+
+class StaticBody:
+    """A response body encoded once, with its ETag and a gzipped copy."""
+
+    def __init__(self, body, media_type):
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.gzipped = gzip.compress(body, compresslevel=9)
+
+    def respond(self, request):
+        headers = {'ETag': self.etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if etag_matches(request.headers.get('if-none-match'), self.etag):
+            return Response(status_code=304, headers=headers)
+        if 'gzip' in request.headers.get('accept-encoding', ''):
+            headers['Content-Encoding'] = 'gzip'
+            return Response(self.gzipped, media_type=self.media_type, headers=headers)
+        return Response(self.body, media_type=self.media_type, headers=headers)
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(',')]
+    return '*' in tags or etag in tags or f"W/{etag}" in tags
+
+def json_body(content):
+    # Same encoding as JSONResponse
+    return StaticBody(
+        json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        "application/json",
+    )
+
+def metadata_bodies():
+    """Encoded /drivers, /constructors, /locations and /metadata for the current snapshot."""
+    global metadata_cache
+    snapshot = predictor.snapshot
+    if metadata_cache is None or metadata_cache[0] is not snapshot:
+        metadata = predictor.get_metadata()
+        bodies = {name: json_body(values) for name, values in metadata.items()}
+        bodies['metadata'] = json_body(metadata)
+        metadata_cache = (snapshot, bodies)
+    return metadata_cache[1]
+
+async def watch_registry(loader):
+    """Polls the registry and swaps in a new active version once it is warmed up."""
+    global predictor
+    await loader
+    loop = asyncio.get_running_loop()
+    while manager is not None:
+        await asyncio.sleep(registry_poll_s)
+        try:
+            if await loop.run_in_executor(None, manager.sync):
+                predictor = manager.current()
+        except Exception as e:
+            logger.error(f"Registry sync failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load in the background so /healthz answers while the model loads;
+    # /readyz reports when predictions can be served.
+    loader = asyncio.get_running_loop().run_in_executor(None, load_predictor)
+    watcher = asyncio.ensure_future(watch_registry(loader)) if registry_dir else None
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    await loader
+    if manager is not None:
+        manager.close()
+    if batcher is not None:
+        await batcher.close()
+
+app = FastAPI(title="F1 2026 Prediction API", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -30,92 +237,132 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- PREDICTOR CLASS (Embedded for robustness) ---
-class F1Predictor:
-    def __init__(self, model_path, features_path):
-        self.model_path = model_path
-        self.features_path = features_path
-        self.model = None
-        self.history_df = None
-        self.load_resources()
-
-    def load_resources(self):
-        logger.info(f"Loading model from {self.model_path}")
-        if os.path.exists(self.model_path):
-            with open(self.model_path, "rb") as f:
-                self.model = pickle.load(f)
-        else:
-            logger.error(f"Model not found at {self.model_path}")
-            raise FileNotFoundError(f"Model not found at {self.model_path}")
-            
-        logger.info(f"Loading features from {self.features_path}")
-        if os.path.exists(self.features_path):
-            self.history_df = pd.read_csv(self.features_path)
-        else:
-            logger.error(f"Features not found at {self.features_path}")
-            raise FileNotFoundError(f"Features not found at {self.features_path}")
-
-    def get_drivers(self):
-        return sorted(self.history_df['driverId'].unique().tolist())
-
-    def get_constructors(self):
-        return sorted(self.history_df['constructorId'].unique().tolist())
-
-    def get_locations(self):
-        return sorted(self.history_df['Location'].unique().tolist())
-
-    def predict(self, race_input):
-        # Preprocess
-        input_df = pd.DataFrame(race_input)
-        
-        # Lookup stats
-        last_driver_stats = self.history_df.sort_values('year').groupby('driverId').last()
-        last_constructor_stats = self.history_df.sort_values('year').groupby('constructorId').last()
-        
-        input_df['driver_win_rate'] = input_df['driverId'].map(last_driver_stats['driver_win_rate']).fillna(0)
-        input_df['driver_recent_form'] = input_df['driverId'].map(last_driver_stats['driver_recent_form']).fillna(20)
-        input_df['constructor_win_rate'] = input_df['constructorId'].map(last_constructor_stats['constructor_win_rate']).fillna(0)
-        input_df['constructor_recent_points'] = input_df['constructorId'].map(last_constructor_stats['constructor_recent_points']).fillna(0)
-        
-        # Mappings
-        loc_map = dict(zip(self.history_df['Location'], self.history_df['location_id']))
-        driver_map = dict(zip(self.history_df['driverId'], self.history_df['driver_id_enc']))
-        const_map = dict(zip(self.history_df['constructorId'], self.history_df['constructor_id_enc']))
-        
-        input_df['location_id'] = input_df['Location'].map(loc_map).fillna(-1)
-        input_df['driver_id_enc'] = input_df['driverId'].map(driver_map).fillna(-1)
-        input_df['constructor_id_enc'] = input_df['constructorId'].map(const_map).fillna(-1)
-        
-        features = [
-            'grid', 'driver_win_rate', 'driver_recent_form',
-            'constructor_win_rate', 'constructor_recent_points',
-            'location_id', 'driver_id_enc', 'constructor_id_enc'
-        ]
-        
-        X = input_df[features]
-        probs = self.model.predict_proba(X)[:, 1]
-        
-        results = []
-        for i, prob in enumerate(probs):
-            results.append({
-                'driverId': race_input[i]['driverId'],
-                'win_probability': float(prob)
-            })
-        results.sort(key=lambda x: x['win_probability'], reverse=True)
-        return results
-
-# --- INITIALIZATION ---
-base_dir = os.path.dirname(os.path.abspath(__file__))
-model_path = os.path.join(base_dir, "src", "models", "xgb_winner_model.pkl")
-features_path = os.path.join(base_dir, "data", "features", "final_features.csv")
-
-predictor = None
-try:
-    predictor = F1Predictor(model_path, features_path)
-    logger.info("Predictor initialized successfully.")
-except Exception as e:
-    logger.error(f"Failed to initialize predictor: {e}")
-    traceback.print_exc()
+# --- METRICS ---
+
+class RequestMetricsMiddleware:
+    """
+    Counts requests and times them end to end, labelled by route template
+    so the label set stays bounded. Also stamps the arrival time on the
+    request state, which lets handlers report how long body parsing and
+    validation took before they were called.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        scope.setdefault('state', {})['received'] = started
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get('route')
+            path = getattr(route, 'path', 'other')
+            REQUESTS.inc(scope['method'], path, str(status))
+            REQUEST_SECONDS.observe(time.perf_counter() - started, scope['method'], path)
+
+# Streamed responses are sent chunk by chunk; gzip would buffer them
+STREAMING_PATHS = {"/predict/season"}
+
+class CompressionMiddleware:
+    """GZipMiddleware for every route except the streaming ones."""
+
+    def __init__(self, app, minimum_size=1000):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] in STREAMING_PATHS:
+            return await self.app(scope, receive, send)
+        return await self.gzip(scope, receive, send)
+
+app.add_middleware(CompressionMiddleware, minimum_size=1000)
+app.add_middleware(RequestMetricsMiddleware)
+
+def record_validation(request):
+    """Observes the time from arrival to handler entry (body read and validation)."""
+    received = getattr(request.state, 'received', None)
+    if received is not None:
+        STAGE_SECONDS.observe(time.perf_counter() - received, 'validation')
+
+def serialize(content, profile_path=None, p=None):
+    with STAGE_SECONDS.time('serialization'):
+        response = JSONResponse(content)
+    if profile_path:
+        response.headers['X-Profile-Artifact'] = os.path.basename(profile_path)
+    version = getattr(p, 'version', None)
+    if version:
+        response.headers['X-Model-Version'] = version
+    return response
+
+def pinned_version(request):
+    """The X-Model-Version header if it names a version other than the active one, else None."""
+    version = request.headers.get('x-model-version')
+    if version is None or version == getattr(predictor, 'version', None):
+        return None
+    return version
+
+def select_predictor(request):
+    """
+    The active predictor, or the version pinned with an X-Model-Version header.
+    Pinned versions are resolved against the registry on disk, so async
+    handlers call this through the threadpool when pinned_version() is set.
+    """
+    version = pinned_version(request)
+    if version is None:
+        return predictor
+    if manager is None:
+        raise HTTPException(404, "Model version pinning needs MODEL_REGISTRY_DIR")
+    try:
+        return manager.get(version)
+    except KeyError as e:
+        raise HTTPException(404, e.args[0])
+    except LookupError as e:
+        raise HTTPException(503, e.args[0], headers={'Retry-After': '1'})
+
+def shadow(p, race_inputs, results):
+    if manager is not None and p is predictor:
+        manager.shadow_score(race_inputs, results)
+
+# Rounds per season in the packed as-of keys (src.pipeline.predict.ROUND_SLOTS,
+# repeated here so the request models don't import the model stack)
+ROUND_SLOTS = 1000
+
+def as_of_point(year, round_):
+    """The (year, round) a /predict request is scored as of, or None for the latest stats."""
+    if (year is None) != (round_ is None):
+        raise HTTPException(422, "as_of_year and as_of_round must be given together")
+    return None if year is None else (year, round_)
+
+def check_as_of(p, points):
+    """422 for as-of points outside the seasons the predictor's feature history covers."""
+    for point in points:
+        if point is not None:
+            try:
+                p.check_as_of(point)
+            except ValueError as e:
+                raise HTTPException(422, str(e))
+
+def wants_profile(request):
+    return profiling_enabled and request.headers.get('x-profile') == '1'
+
+def run_profiled(prefix, fn, *args):
+    """Runs fn under the stack profiler (on this thread) and saves the profile."""
+    from src.pipeline.profiling import profile_call
+    result, profiler = profile_call(fn, *args)
+    path = profiler.save(profile_dir, prefix)
+    logger.info(f"Saved {prefix} profile to {path}")
+    return result, path
 
 # --- MODELS ---
 class DriverInput(BaseModel):
@@ -128,6 +375,53 @@ class PredictionOutput(BaseModel):
     driverId: str
     win_probability: float
 
+class GridEntry(BaseModel):
+    driverId: str
+    constructorId: str
+    grid: int
+
+class AsOf(BaseModel):
+    year: int = Field(..., ge=0)
+    round: int = Field(..., ge=0, lt=ROUND_SLOTS)
+
+class RaceInput(BaseModel):
+    Location: str
+    drivers: List[GridEntry]
+    # Score with the stats known before this round instead of the latest
+    as_of: Optional[AsOf] = None
+
+class SweepInput(BaseModel):
+    drivers: List[DriverInput]
+    dimension: Literal['grid', 'Location', 'constructorId']
+    driverId: Optional[str] = None
+    values: Optional[List[Union[int, str]]] = None
+
+class SweepOutput(BaseModel):
+    dimension: str
+    values: List[Union[int, str]]
+    drivers: List[str]
+    probabilities: List[List[float]]
+
+class SeasonInput(BaseModel):
+    years: List[int]
+    from_round: Optional[int] = None
+    drivers: Optional[List[GridEntry]] = None
+    format: Literal['ndjson', 'sse'] = 'ndjson'
+    point_in_time: bool = False
+
+class SimulationInput(BaseModel):
+    drivers: List[DriverInput]
+    n_simulations: int = Field(10000, ge=1, le=1_000_000)
+    seed: Optional[int] = None
+
+class SimulationOutput(BaseModel):
+    driverId: str
+    win_probability: float
+    podium_probability: float
+    expected_points: float
+    expected_position: float
+    position_distribution: List[float]
+
 # --- HTML FRONTEND ---
 html_content = """
 <!DOCTYPE html>
@@ -184,15 +478,13 @@ html_content = """
 
         async function fetchData() {
             try {
-                const [driversRes, constructorsRes, locationsRes] = await Promise.all([
-                    fetch('/drivers'),
-                    fetch('/constructors'),
-                    fetch('/locations')
-                ]);
+                const metadataRes = await fetch('/metadata');
+                if (!metadataRes.ok) throw new Error(await metadataRes.text());
+                const metadata = await metadataRes.json();
 
-                driversList = await driversRes.json();
-                constructorsList = await constructorsRes.json();
-                const locations = await locationsRes.json();
+                driversList = metadata.drivers;
+                constructorsList = metadata.constructors;
+                const locations = metadata.locations;
 
                 const locSelect = document.getElementById('location');
                 locations.forEach(loc => {
@@ -300,36 +592,199 @@ html_content = """
 </html>
 """
 
+index_body = StaticBody(html_content.encode("utf-8"), "text/html; charset=utf-8")
+
 # --- ENDPOINTS ---
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    body = {"status": startup['status'], "timings": startup['timings']}
+    if startup['error']:
+        body["error"] = startup['error']
+    return JSONResponse(body, status_code=200 if predictor else 503)
+
 @app.get("/", response_class=HTMLResponse)
-def read_root():
-    return html_content
+def read_root(request: Request):
+    return index_body.respond(request)
 
 @app.get("/drivers")
-def get_drivers():
-    if not predictor: raise HTTPException(500, "Model not initialized")
-    return predictor.get_drivers()
+def get_drivers(request: Request):
+    if not predictor: raise HTTPException(503, "Model not ready")
+    return metadata_bodies()['drivers'].respond(request)
 
 @app.get("/constructors")
-def get_constructors():
-    if not predictor: raise HTTPException(500, "Model not initialized")
-    return predictor.get_constructors()
+def get_constructors(request: Request):
+    if not predictor: raise HTTPException(503, "Model not ready")
+    return metadata_bodies()['constructors'].respond(request)
 
 @app.get("/locations")
-def get_locations():
-    if not predictor: raise HTTPException(500, "Model not initialized")
-    return predictor.get_locations()
+def get_locations(request: Request):
+    if not predictor: raise HTTPException(503, "Model not ready")
+    return metadata_bodies()['locations'].respond(request)
+
+@app.get("/metadata")
+def get_metadata(request: Request):
+    if not predictor: raise HTTPException(503, "Model not ready")
+    return metadata_bodies()['metadata'].respond(request)
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+def cache_stats():
+    if not predictor: raise HTTPException(503, "Model not ready")
+    if predictor.cache is None: return {}
+    return predictor.cache.stats()
 
 @app.post("/predict", response_model=List[PredictionOutput])
-def predict_race(drivers: List[DriverInput]):
-    if not predictor: raise HTTPException(500, "Model not initialized")
+async def predict_race(drivers: List[DriverInput], request: Request,
+                       as_of_year: Optional[int] = Query(None, ge=0),
+                       as_of_round: Optional[int] = Query(None, ge=0, lt=ROUND_SLOTS)):
+    record_validation(request)
+    if not predictor: raise HTTPException(503, "Model not ready")
+    p = predictor if pinned_version(request) is None else await run_in_threadpool(select_predictor, request)
+    as_of = as_of_point(as_of_year, as_of_round)
+    check_as_of(p, [as_of])
     try:
         race_input = [d.dict() for d in drivers]
-        return predictor.predict(race_input)
+        if wants_profile(request):
+            # Profiles the uncached scoring path, bypassing the batcher
+            results, path = await run_in_threadpool(run_profiled, "predict", predict_uncached, p, race_input, as_of)
+            return serialize(results, path, p)
+        if as_of is not None:
+            # Point-in-time requests skip the batcher and shadow scoring,
+            # which both work on the latest stats
+            return serialize(await run_in_threadpool(predict_one, p, race_input, as_of), p=p)
+        if batcher is not None and p is predictor:
+            results = await batcher.submit(race_input)
+        else:
+            results = await run_in_threadpool(predict_one, p, race_input)
+        shadow(p, [race_input], [results])
+        return serialize(results, p=p)
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         raise HTTPException(500, str(e))
 
+@app.post("/predict/batch", response_model=List[List[PredictionOutput]])
+def predict_races(races: List[RaceInput], request: Request):
+    record_validation(request)
+    if not predictor: raise HTTPException(503, "Model not ready")
+    p = select_predictor(request)
+    as_of = [(race.as_of.year, race.as_of.round) if race.as_of else None for race in races]
+    check_as_of(p, as_of)
+    try:
+        p.refresh_if_stale()
+        race_inputs = [
+            [{**d.dict(), 'Location': race.Location} for d in race.drivers]
+            for race in races
+        ]
+        if all(point is None for point in as_of):
+            as_of = None
+        if wants_profile(request):
+            # Profiles the uncached scoring path, as for /predict
+            return serialize(*run_profiled("predict_batch", p.predict_many, race_inputs, as_of, False), p)
+        results = p.predict_many(race_inputs, as_of)
+        if as_of is None:
+            shadow(p, race_inputs, results)
+        return serialize(results, p=p)
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        raise HTTPException(500, str(e))
+
+@app.post("/predict/sweep", response_model=SweepOutput)
+def predict_sweep(sweep: SweepInput):
+    if not predictor: raise HTTPException(503, "Model not ready")
+    predictor.refresh_if_stale()
+    race_input = [d.dict() for d in sweep.drivers]
+    try:
+        return predictor.sweep(race_input, sweep.dimension, sweep.driverId, sweep.values)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+
+def season_calendar():
+    global calendar_cache
+    from src.pipeline.predict import file_signature
+    from src.pipeline.season import load_calendar
+    if not os.path.exists(races_path): raise HTTPException(404, "Season calendar (races.csv) not found")
+    signature = file_signature(races_path)
+    if calendar_cache is None or calendar_cache[0] != signature:
+        calendar_cache = (signature, load_calendar(races_path))
+    return calendar_cache[1]
+
+def stream_season(years, from_round, drivers, fmt, point_in_time=False):
+    """Streams per-round predictions as NDJSON lines or server-sent events."""
+    from src.pipeline.season import projected_grid, season_rounds, iter_season_predictions
+    if not predictor: raise HTTPException(503, "Model not ready")
+    p = predictor
+    p.refresh_if_stale()
+    rounds = season_rounds(season_calendar(), p, years, from_round)
+    if rounds.empty:
+        raise HTTPException(404, f"No conventional rounds for {years} in the calendar")
+    grid = [d.dict() for d in drivers] if drivers else projected_grid(p)
+
+    def body():
+        # A sync generator: Starlette iterates it on the threadpool, and only
+        # one chunk of rounds is held in memory at a time
+        n = 0
+        for record in iter_season_predictions(p, rounds, grid, point_in_time=point_in_time):
+            n += 1
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+            yield f"event: round\ndata: {line}\n\n" if fmt == 'sse' else line + "\n"
+        if fmt == 'sse':
+            yield f"event: end\ndata: {json.dumps({'rounds': n})}\n\n"
+
+    media_type = "text/event-stream" if fmt == 'sse' else "application/x-ndjson"
+    # The route is in STREAMING_PATHS, so it isn't gzipped (and buffered);
+    # X-Accel-Buffering keeps nginx from buffering it too
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return StreamingResponse(body(), media_type=media_type, headers=headers)
+
+@app.get("/predict/season")
+def predict_season(year: int = Query(..., ge=0), end_year: Optional[int] = Query(None, ge=0),
+                   from_round: Optional[int] = None,
+                   format: Literal['ndjson', 'sse'] = 'ndjson', point_in_time: bool = False):
+    """
+    Streams predictions for a season (or year..end_year) with the projected
+    grid. With point_in_time, each round uses the stats known before it.
+    """
+    if not predictor: raise HTTPException(503, "Model not ready")
+    end_year = year if end_year is None else end_year
+    if end_year < year:
+        raise HTTPException(422, "end_year must not be before year")
+    calendar = season_calendar()
+    last = int(calendar['year'].max()) if len(calendar) else None
+    if last is None or end_year > last:
+        raise HTTPException(422, f"end_year {end_year} is past the end of the calendar ({last})")
+    # Years come from the calendar, so the list is bounded by its size
+    years = sorted(calendar.loc[calendar['year'].between(year, end_year), 'year'].unique().tolist())
+    if not years:
+        raise HTTPException(404, f"No conventional rounds for {year}-{end_year} in the calendar")
+    return stream_season(years, from_round, None, format, point_in_time)
+
+@app.post("/predict/season")
+def predict_season_grid(season: SeasonInput):
+    """Streams predictions for the given seasons with a custom (or projected) grid."""
+    return stream_season(season.years, season.from_round, season.drivers, season.format, season.point_in_time)
+
+@app.post("/simulate", response_model=List[SimulationOutput])
+def simulate(sim: SimulationInput):
+    if not predictor: raise HTTPException(503, "Model not ready")
+    try:
+        predictor.refresh_if_stale()
+        from src.pipeline.simulate import simulate_race
+        race_input = [d.dict() for d in sim.drivers]
+        return simulate_race(predictor, race_input, sim.n_simulations, seed=sim.seed)
+    except Exception as e:
+        logger.error(f"Simulation error: {e}")
+        raise HTTPException(500, str(e))
+
+startup['timings']['app_import_s'] = time.perf_counter() - _import_started
+STARTUP_SECONDS.set(startup['timings']['app_import_s'], 'app_import_s')
+
 if __name__ == "__main__":
     host = os.getenv("HOST", "127.0.0.1")
     port = int(os.getenv("PORT", 5000))
@@ -0,0 +1,93 @@
+"""
+Load test for the /predict micro-batcher.
+
+Drives F1Predictor in-process with closed-loop asyncio clients (each sends
+its next grid as soon as the previous one returns) and compares one
+predict() per request on the thread pool against MicroBatcher at several
+wait windows. Reports throughput and p50/p99 latency. The prediction
+cache is disabled and every grid is random, so each request is scored.
+
+    python -m benchmarks.bench_batching [--clients 64] [--duration 5]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import warnings
+
+import numpy as np
+
+from src.pipeline.predict import F1Predictor
+from src.pipeline.batcher import MicroBatcher
+
+warnings.filterwarnings("ignore")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(BASE_DIR, "src", "models", "xgb_winner_model.pkl")
+FEATURES_PATH = os.path.join(BASE_DIR, "data", "features", "final_features.parquet")
+
+
+def random_grids(predictor, n, size=20, seed=0):
+    rng = random.Random(seed)
+    drivers = predictor.get_drivers()
+    constructors = predictor.get_constructors()
+    locations = predictor.get_locations()
+    grids = []
+    for _ in range(n):
+        location = rng.choice(locations)
+        grids.append([
+            {'driverId': d, 'constructorId': rng.choice(constructors), 'grid': i + 1, 'Location': location}
+            for i, d in enumerate(rng.sample(drivers, min(size, len(drivers))))
+        ])
+    return grids
+
+
+async def run_clients(call, grids, clients, duration):
+    latencies = []
+    stop = time.perf_counter() + duration
+
+    async def client(offset):
+        i = offset
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            await call(grids[i % len(grids)])
+            latencies.append(time.perf_counter() - start)
+            i += clients
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    elapsed = time.perf_counter() - start
+    lat = np.array(latencies) * 1e3
+    return len(lat) / elapsed, np.percentile(lat, 50), np.percentile(lat, 99)
+
+
+async def main(clients, duration):
+    predictor = F1Predictor(MODEL_PATH, FEATURES_PATH, cache_size=0)
+    grids = random_grids(predictor, 2000)
+    loop = asyncio.get_running_loop()
+
+    print(f"{clients} concurrent clients, 20-driver grids, {duration}s per configuration")
+    print(f"{'mode':>16} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+
+    async def unbatched(grid):
+        return await loop.run_in_executor(None, predictor.predict, grid)
+
+    rps, p50, p99 = await run_clients(unbatched, grids, clients, duration)
+    print(f"{'unbatched':>16} {rps:>8.0f} {p50:>8.2f} {p99:>8.2f}")
+
+    for wait_ms in [0.5, 1, 2, 5]:
+        batcher = MicroBatcher(predictor.predict_many, max_wait_ms=wait_ms, max_rows=1024)
+        rps, p50, p99 = await run_clients(batcher.submit, grids, clients, duration)
+        await batcher.close()
+        label = f"batch {wait_ms}ms"
+        print(f"{label:>16} {rps:>8.0f} {p50:>8.2f} {p99:>8.2f}  "
+              f"(avg {batcher.requests / max(batcher.batches, 1):.1f} req/batch)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.clients, args.duration))
@@ -0,0 +1,55 @@
+"""
+Scaling benchmark for the rolling/cumulative feature engine.
+
+Compares calculate_driver_metrics/calculate_constructor_metrics (windows
+3, 5 and 10 in one pass) with the per-group lambda implementation they
+replaced, on synthetic seasons. Run from the repository root:
+
+    python -m benchmarks.bench_features
+"""
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_race_data
+from src.features.build_features import calculate_driver_metrics, calculate_constructor_metrics
+
+WINDOWS = (3, 5, 10)
+SEASONS = [1, 5, 10, 25, 50, 75]
+
+
+def legacy_metrics(df, windows=WINDOWS):
+    """The groupby().transform(lambda ...) implementation, one pass per window."""
+    df = df.sort_values(['year', 'round'])
+    df['position_numeric'] = pd.to_numeric(df['positionOrder'], errors='coerce').fillna(20)
+    for key, value in [('driverId', 'position_numeric'), ('constructorId', 'points')]:
+        df[f'{key}_wins_cum'] = df.groupby(key)['is_winner'].cumsum() - df['is_winner']
+        df[f'{key}_races_cum'] = df.groupby(key).cumcount()
+        for w in windows:
+            df[f'{key}_recent_{w}'] = df.groupby(key)[value].transform(
+                lambda x: x.shift(1).rolling(window=w, min_periods=1).mean()
+            )
+    return df
+
+
+def vectorized_metrics(df, windows=WINDOWS):
+    return calculate_constructor_metrics(calculate_driver_metrics(df, windows), windows)
+
+
+def best_of(fn, df, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(df.copy())
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    print(f"{'seasons':>8} {'rows':>8} {'legacy ms':>10} {'vector ms':>10} {'ns/row':>8} {'speedup':>8}")
+    for n_seasons in SEASONS:
+        df = generate_race_data(n_seasons)
+        legacy = best_of(legacy_metrics, df)
+        vector = best_of(vectorized_metrics, df)
+        print(f"{n_seasons:>8} {len(df):>8} {legacy * 1e3:>10.1f} {vector * 1e3:>10.1f} "
+              f"{vector / len(df) * 1e9:>8.0f} {legacy / vector:>7.1f}x")
@@ -0,0 +1,76 @@
+"""
+Measures API cold start: process launch to first /healthz, to /readyz and
+to the first successful /predict, for each model evaluator.
+
+Launches `uvicorn app:app` as a subprocess on a free local port.
+
+    python -m benchmarks.bench_startup
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAYLOAD = json.dumps([
+    {"driverId": "max_verstappen", "constructorId": "Red Bull Racing", "grid": 1, "Location": "Monza"},
+    {"driverId": "leclerc", "constructorId": "Ferrari", "grid": 2, "Location": "Monza"},
+]).encode()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def status(url, data=None):
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except (urllib.error.URLError, ConnectionError):
+        return None, None
+
+
+def wait_for(url, started, data=None, timeout=60):
+    while time.perf_counter() - started < timeout:
+        code, body = status(url, data)
+        if code == 200:
+            return time.perf_counter() - started, body
+        time.sleep(0.01)
+    raise TimeoutError(url)
+
+
+def measure(evaluator):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, MODEL_EVALUATOR=evaluator)
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        healthy, _ = wait_for(f"{base}/healthz", started)
+        ready, body = wait_for(f"{base}/readyz", started)
+        first, _ = wait_for(f"{base}/predict", started, data=PAYLOAD)
+        return healthy, ready, first, json.loads(body)["timings"]
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    print(f"{'evaluator':>10} {'healthz s':>10} {'readyz s':>10} {'1st predict s':>14}  in-process timings")
+    for evaluator in ["xgboost", "numpy"]:
+        healthy, ready, first, timings = measure(evaluator)
+        detail = ", ".join(f"{k}={v:.3f}" for k, v in timings.items())
+        print(f"{evaluator:>10} {healthy:>10.2f} {ready:>10.2f} {first:>14.2f}  {detail}")
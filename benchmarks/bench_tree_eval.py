@@ -0,0 +1,75 @@
+"""
+Checks the pure-NumPy tree evaluator against XGBoost and compares latency.
+
+Verifies TreeEnsemble.predict_proba against the pickled XGBClassifier on the
+real feature rows and on random rows (with missing values), then times
+both for several batch sizes.
+
+    python -m benchmarks.bench_tree_eval
+"""
+import os
+import pickle
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from src.pipeline.predict import FEATURES
+from src.pipeline.tree_eval import TreeEnsemble
+
+warnings.filterwarnings("ignore")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(BASE_DIR, "src", "models")
+FEATURES_PATH = os.path.join(BASE_DIR, "data", "features", "final_features.csv")
+TOLERANCE = 1e-6
+
+
+def random_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'grid': rng.integers(0, 21, n),
+        'driver_win_rate': rng.random(n),
+        'driver_recent_form': rng.uniform(0, 20, n),
+        'constructor_win_rate': rng.random(n),
+        'constructor_recent_points': rng.uniform(0, 40, n),
+        'location_id': rng.integers(-1, 25, n),
+        'driver_id_enc': rng.integers(-1, 30, n),
+        'constructor_id_enc': rng.integers(-1, 12, n),
+    }, columns=FEATURES).astype(float)
+    X.iloc[::7, 2] = np.nan
+    return X
+
+
+def timed(fn, X, repeat):
+    fn(X)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(X)
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    with open(os.path.join(MODELS_DIR, "xgb_winner_model.pkl"), "rb") as f:
+        model = pickle.load(f)
+    pkl_load = time.perf_counter() - start
+    start = time.perf_counter()
+    trees = TreeEnsemble.from_json(os.path.join(MODELS_DIR, "xgb_winner_model.json"))
+    json_load = time.perf_counter() - start
+    print(f"load: pickle {pkl_load * 1e3:.1f} ms, numpy JSON {json_load * 1e3:.1f} ms "
+          f"({len(trees.roots)} trees, depth {trees.depth})")
+
+    for name, X in [("real rows", pd.read_csv(FEATURES_PATH)[FEATURES]), ("random rows", random_rows(20000))]:
+        diff = np.abs(model.predict_proba(X) - trees.predict_proba(X)).max()
+        status = "OK" if diff <= TOLERANCE else "MISMATCH"
+        print(f"{name:>12}: max |xgboost - numpy| = {diff:.2e} [{status}]")
+
+    print(f"\n{'rows':>8} {'xgboost us':>12} {'numpy us':>10} {'speedup':>8}")
+    for n in [1, 20, 200, 2000, 20000]:
+        X = random_rows(n, seed=n)
+        repeat = max(5, 2000 // n)
+        xgb_t = timed(model.predict_proba, X, repeat)
+        np_t = timed(trees.predict_proba, X, repeat)
+        print(f"{n:>8} {xgb_t * 1e6:>12.0f} {np_t * 1e6:>10.0f} {xgb_t / np_t:>7.1f}x")
@@ -0,0 +1,126 @@
+"""
+Per-worker memory of the multi-worker server (src/pipeline/serve.py).
+
+For 1, 4 and 16 workers, launches the server in three modes:
+  - private: every worker reads the feature file and loads the model itself
+  - shared-features: workers memory-map the exported Arrow feature file
+  - preload: the model and features are loaded once, then workers fork
+then sends some traffic and reads RSS, PSS (RSS with shared pages split
+between the processes sharing them) and USS (private pages) for every
+worker from /proc/<pid>/smaps_rollup. Linux only.
+
+    python -m benchmarks.bench_workers [--workers 1 4 16]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.bench_startup import free_port
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {
+    'private': ["--no-preload", "--no-shared-features"],
+    'shared-features': ["--no-preload"],
+    'preload': [],
+}
+PAYLOAD = json.dumps([
+    {"driverId": "max_verstappen", "constructorId": "Red Bull Racing", "grid": 1, "Location": "Monza"},
+    {"driverId": "leclerc", "constructorId": "Ferrari", "grid": 2, "Location": "Monza"},
+]).encode()
+
+
+def memory(pid):
+    """(rss, pss, uss) in MB from smaps_rollup."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return fields.get("Rss", 0), fields.get("Pss", 0), uss
+
+
+def children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(c) for c in f.read().split()]
+
+
+def request(url, data=None):
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError):
+        return None
+
+
+def wait_until_loaded(proc, workers, port, timeout=300):
+    """Waits for /readyz, then for the workers' combined RSS to stop growing."""
+    started = time.perf_counter()
+    while request(f"http://127.0.0.1:{port}/readyz") != 200:
+        if proc.poll() is not None or time.perf_counter() - started > timeout:
+            raise RuntimeError("server did not become ready")
+        time.sleep(0.2)
+    previous = 0
+    while time.perf_counter() - started < timeout:
+        pids = children(proc.pid)
+        total = sum(memory(p)[0] for p in pids)
+        if len(pids) == workers and abs(total - previous) < 0.01 * total:
+            return pids
+        previous = total
+        time.sleep(1.5)
+    raise RuntimeError("workers did not settle")
+
+
+def measure(mode, workers):
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "src.pipeline.serve", "--workers", str(workers), "--port", str(port), *MODES[mode]],
+        cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        pids = wait_until_loaded(proc, workers, port)
+        for _ in range(20 * workers):
+            request(f"http://127.0.0.1:{port}/predict", PAYLOAD)
+        per_worker = [memory(p) for p in pids]
+        parent = memory(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait()
+    n = len(per_worker)
+    return {
+        'mode': mode,
+        'workers': workers,
+        'rss_mb': sum(m[0] for m in per_worker) / n,
+        'pss_mb': sum(m[1] for m in per_worker) / n,
+        'uss_mb': sum(m[2] for m in per_worker) / n,
+        'total_pss_mb': sum(m[1] for m in per_worker) + parent[1],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure per-worker memory of the multi-worker server.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--output", help="Also write the results as JSON.")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'mode':<16} {'workers':>7} {'RSS/worker':>11} {'PSS/worker':>11} {'USS/worker':>11} {'total PSS':>10}")
+    for mode in args.modes:
+        for workers in args.workers:
+            r = measure(mode, workers)
+            results.append(r)
+            print(f"{mode:<16} {workers:>7} {r['rss_mb']:>9.1f}MB {r['pss_mb']:>9.1f}MB "
+                  f"{r['uss_mb']:>9.1f}MB {r['total_pss_mb']:>8.0f}MB", flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,396 @@
+"""
+Async load generator for the prediction API.
+
+Replays realistic grids (constructor pairs of drivers, a shuffled starting
+order, one location per race) built from the API's own /metadata, which
+serves get_drivers/get_constructors/get_locations, against one of:
+  - in-process (default): app.py's ASGI app, called directly on this
+    event loop after its lifespan has loaded the model; no sockets
+  - --launch: a local copy of app.py started on a free port (or
+    src.pipeline.serve with --workers N) and stopped afterwards
+  - --url: an already running server
+
+Load is either closed-loop (--concurrency clients, each sending its next
+request when the previous one returns) or open-loop (--rate requests per
+second with Poisson arrivals, latency measured from the scheduled arrival
+so a slow server can't hide queueing). Reports throughput, p50/p95/p99
+latency, errors by kind and the prediction-cache hit rate over the run.
+The in-process and launched targets run with the prediction cache off
+(PREDICTION_CACHE_SIZE=0) unless --cache is given, since the payloads
+repeat and cache hits would be measured instead of scoring.
+
+    python -m benchmarks.loadtest [--concurrency 32 | --rate 200] [--duration 10]
+        [--endpoint predict|batch] [--launch [--workers 4] | --url http://127.0.0.1:5000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from benchmarks.bench_startup import free_port
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# --- TARGETS ---
+
+class HTTPTarget:
+    """
+    Minimal keep-alive HTTP/1.1 client over asyncio streams, with a pool of
+    up to max_connections connections. Enough for the API's JSON responses,
+    which always carry a Content-Length.
+    """
+
+    def __init__(self, url, max_connections=256, timeout=30.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+    async def _exchange(self, conn, method, path, body):
+        reader, writer = conn
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        status = int(status_line.split()[1])
+        length, keep_alive = None, True
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                keep_alive = False
+        payload = await (reader.readexactly(length) if length is not None else reader.read())
+        return status, payload, keep_alive and length is not None
+
+    async def request(self, method, path, body=b""):
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else await asyncio.open_connection(self.host, self.port)
+            try:
+                status, payload, reusable = await asyncio.wait_for(
+                    self._exchange(conn, method, path, body), self.timeout)
+            except BaseException:
+                conn[1].close()
+                raise
+            if reusable:
+                self._idle.append(conn)
+            else:
+                conn[1].close()
+            return status, payload
+
+
+class ASGITarget:
+    """Calls an ASGI app directly, running its lifespan around the test."""
+
+    def __init__(self, app):
+        self.app = app
+        self._lifespan = None
+
+    async def start(self):
+        self._lifespan = self.app.router.lifespan_context(self.app)
+        await self._lifespan.__aenter__()
+
+    async def close(self):
+        if self._lifespan is not None:
+            await self._lifespan.__aexit__(None, None, None)
+
+    async def request(self, method, path, body=b""):
+        path, _, query = path.partition("?")
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query.encode(), 'root_path': '',
+            'headers': [(b'host', b'loadtest'), (b'content-type', b'application/json'),
+                        (b'content-length', str(len(body)).encode())],
+            'client': ('127.0.0.1', 0), 'server': ('loadtest', 80), 'state': {},
+        }
+        sent = False
+        response = {'status': None, 'body': []}
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            await asyncio.Event().wait()  # no disconnect while the response is pending
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                response['body'].append(message.get('body', b''))
+
+        await self.app(scope, receive, send)
+        return response['status'], b"".join(response['body'])
+
+
+def launch(workers=None, env=None):
+    """Starts app.py (or the multi-worker server) on a free port. Returns (process, url)."""
+    port = free_port()
+    if workers:
+        cmd = [sys.executable, "-m", "src.pipeline.serve", "--workers", str(workers), "--port", str(port)]
+    else:
+        cmd = [sys.executable, "app.py"]
+    env = dict(os.environ, **(env or {}), HOST="127.0.0.1", PORT=str(port))
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return proc, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(target, proc=None, timeout=120):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            status, _ = await target.request("GET", "/readyz")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError("server did not become ready")
+
+
+# --- PAYLOADS ---
+
+def build_grids(metadata, n, size=20, seed=0):
+    """
+    n race grids: size // 2 constructors with two drivers each (a driver
+    short for odd sizes), the drivers drawn without replacement, a shuffled
+    starting order and one location for the whole grid.
+    """
+    rng = random.Random(seed)
+    drivers, constructors, locations = metadata['drivers'], metadata['constructors'], metadata['locations']
+    size = min(size, len(drivers), 2 * len(constructors))
+    grids = []
+    for _ in range(n):
+        teams = rng.sample(constructors, (size + 1) // 2)
+        seats = [team for team in teams for _ in range(2)][:size]
+        slots = rng.sample(range(1, size + 1), size)
+        location = rng.choice(locations)
+        grids.append([
+            {'driverId': d, 'constructorId': team, 'grid': slot, 'Location': location}
+            for d, team, slot in zip(rng.sample(drivers, size), seats, slots)
+        ])
+    return grids
+
+
+def build_requests(grids, endpoint, races_per_batch=8):
+    """(path, body) pairs for /predict (one grid each) or /predict/batch."""
+    if endpoint == 'predict':
+        return [("/predict", json.dumps(grid).encode()) for grid in grids]
+    requests = []
+    for start in range(0, len(grids) - races_per_batch + 1, races_per_batch):
+        races = [
+            {'Location': grid[0]['Location'],
+             'drivers': [{k: v for k, v in d.items() if k != 'Location'} for d in grid]}
+            for grid in grids[start:start + races_per_batch]
+        ]
+        requests.append(("/predict/batch", json.dumps(races).encode()))
+    return requests
+
+
+# --- LOAD ---
+
+class Recorder:
+    def __init__(self):
+        self.latencies = []
+        self.errors = {}
+        self.started = None
+        self.finished = None
+
+    def record(self, latency, status=None, error=None):
+        if error is None and 200 <= status < 300:
+            self.latencies.append(latency)
+            return
+        kind = f"http_{status}" if error is None else type(error).__name__
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def summary(self):
+        elapsed = self.finished - self.started
+        ok = len(self.latencies)
+        failed = sum(self.errors.values())
+        lat = np.array(self.latencies) * 1e3 if ok else np.array([np.nan])
+        return {
+            'requests': ok + failed,
+            'ok': ok,
+            'errors': dict(self.errors),
+            'error_rate': failed / (ok + failed) if ok + failed else 0.0,
+            'duration_s': elapsed,
+            'throughput_rps': ok / elapsed if elapsed else 0.0,
+            'p50_ms': float(np.percentile(lat, 50)),
+            'p95_ms': float(np.percentile(lat, 95)),
+            'p99_ms': float(np.percentile(lat, 99)),
+            'max_ms': float(lat.max()),
+        }
+
+
+async def send(target, recorder, path, body, scheduled):
+    try:
+        status, _ = await target.request("POST", path, body)
+    except Exception as e:
+        recorder.record(time.perf_counter() - scheduled, error=e)
+    else:
+        recorder.record(time.perf_counter() - scheduled, status)
+
+
+async def closed_loop(target, requests, concurrency, duration):
+    recorder = Recorder()
+    stop = time.perf_counter() + duration
+
+    async def client(offset):
+        i = offset
+        while time.perf_counter() < stop:
+            path, body = requests[i % len(requests)]
+            await send(target, recorder, path, body, time.perf_counter())
+            i += concurrency
+
+    recorder.started = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(concurrency)))
+    recorder.finished = time.perf_counter()
+    return recorder
+
+
+async def open_loop(target, requests, rate, duration, seed=0):
+    """
+    Poisson arrivals at `rate` per second. Each request is timed from its
+    scheduled arrival, so time spent waiting for a connection or for the
+    loop to catch up counts towards its latency.
+    """
+    recorder = Recorder()
+    rng = random.Random(seed)
+    tasks = []
+    recorder.started = now = time.perf_counter()
+    scheduled = now
+    stop = now + duration
+    i = 0
+    while True:
+        scheduled += rng.expovariate(rate)
+        if scheduled >= stop:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        path, body = requests[i % len(requests)]
+        tasks.append(asyncio.ensure_future(send(target, recorder, path, body, scheduled)))
+        i += 1
+    await asyncio.gather(*tasks)
+    recorder.finished = time.perf_counter()
+    return recorder
+
+
+async def cache_stats(target):
+    """The target's /cache/stats, or {} when its cache is off or unavailable."""
+    status, body = await target.request("GET", "/cache/stats")
+    return json.loads(body) if status == 200 else {}
+
+
+def hit_rate(before, after):
+    """Cache hit rate between two /cache/stats readings, None without a cache."""
+    if 'hits' not in before or 'hits' not in after:
+        return None
+    hits = after['hits'] - before['hits']
+    lookups = hits + after['misses'] - before['misses']
+    return hits / lookups if lookups else None
+
+
+async def run(args):
+    proc = None
+    cache_env = {} if args.cache else {"PREDICTION_CACHE_SIZE": "0"}
+    if args.url:
+        target = HTTPTarget(args.url, args.max_connections, args.timeout)
+    elif args.launch:
+        proc, url = launch(args.workers, cache_env)
+        target = HTTPTarget(url, args.max_connections, args.timeout)
+    else:
+        os.environ.update(cache_env)  # read by app.py when the lifespan builds the predictor
+        import app as app_module
+        target = ASGITarget(app_module.app)
+    try:
+        await target.start()
+        # A server given by --url should already be up; launched ones get time to load
+        await wait_ready(target, proc, timeout=10 if args.url else 120)
+        status, body = await target.request("GET", "/metadata")
+        if status != 200:
+            raise RuntimeError(f"/metadata returned {status}")
+        grids = build_grids(json.loads(body), args.payloads, args.grid_size, args.seed)
+        requests = build_requests(grids, args.endpoint, args.races_per_batch)
+
+        if args.warmup:
+            await closed_loop(target, requests, min(args.concurrency, 8), args.warmup)
+        before = await cache_stats(target)
+        if args.rate:
+            recorder = await open_loop(target, requests, args.rate, args.duration, args.seed)
+        else:
+            recorder = await closed_loop(target, requests, args.concurrency, args.duration)
+        # With several workers, /cache/stats comes from whichever one answers
+        return {**recorder.summary(), 'cache_hit_rate': hit_rate(before, await cache_stats(target))}
+    finally:
+        await target.close()
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the prediction API.")
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument("--url", help="Test a running server instead of the in-process app.")
+    where.add_argument("--launch", action="store_true", help="Start a local copy of app.py and test it.")
+    parser.add_argument("--workers", type=int, help="With --launch, start src.pipeline.serve with N workers.")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=32, help="Closed-loop clients (default 32).")
+    load.add_argument("--rate", type=float, help="Open-loop arrivals per second.")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0, help="Seconds of untimed load first.")
+    parser.add_argument("--endpoint", choices=["predict", "batch"], default="predict")
+    parser.add_argument("--grid-size", type=int, default=20)
+    parser.add_argument("--races-per-batch", type=int, default=8)
+    parser.add_argument("--payloads", type=int, default=1000, help="Distinct grids to cycle through.")
+    parser.add_argument("--cache", action="store_true",
+                        help="Keep the prediction cache on (in-process and --launch targets).")
+    parser.add_argument("--max-connections", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the summary as JSON.")
+    args = parser.parse_args()
+
+    mode = f"open loop, {args.rate:g} req/s" if args.rate else f"closed loop, {args.concurrency} clients"
+    target = args.url or ("launched " + (f"serve.py x{args.workers}" if args.workers else "app.py")
+                          if args.launch else "in-process")
+    result = asyncio.run(run(args))
+    print(f"{target}, /{args.endpoint}, {mode}, {result['duration_s']:.1f}s")
+    print(f"  requests   {result['requests']:>8}  ok {result['ok']}  error rate {result['error_rate']:.2%}"
+          + (f"  {result['errors']}" if result['errors'] else ""))
+    cache = "off" if result['cache_hit_rate'] is None else f"hit rate {result['cache_hit_rate']:.1%}"
+    print(f"  throughput {result['throughput_rps']:>8.1f} req/s  (prediction cache {cache})")
+    print(f"  latency    p50 {result['p50_ms']:.2f} ms  p95 {result['p95_ms']:.2f} ms  "
+          f"p99 {result['p99_ms']:.2f} ms  max {result['max_ms']:.2f} ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({**vars(args), **result}, f, indent=2)
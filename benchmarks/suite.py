@@ -0,0 +1,239 @@
+"""
+End-to-end benchmark suite on synthetic seasons.
+
+For each history size, writes a synthetic race_data.csv into a temporary
+directory (that many training seasons ending in 2023, plus 2024 as
+train_model's held-out test season) and measures:
+
+  - build_features stage times (load, driver and constructor metrics,
+    encoding, CSV/Parquet writes, incremental state)
+  - train_model fit time
+  - F1Predictor load time and RSS, in a fresh process
+  - single-grid predict() latency and predict_many() batch latency, with
+    the prediction cache off
+
+Results are written as JSON so runs on two commits can be compared:
+
+    python -m benchmarks.suite --seasons 1 10 75 --output before.json
+    python -m benchmarks.suite --seasons 1 10 75 --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_race_data
+
+warnings.filterwarnings("ignore")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEASONS = [1, 5, 25, 75]
+BATCH_GRIDS = 64
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def rss_mb():
+    """Resident set size of this process in MB (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def bench_features(processed_dir, features_dir):
+    """Runs the full build stage by stage. Returns (features_df, {stage: seconds})."""
+    from src.features import build_features as bf
+
+    stages = {}
+    df, stages['load_s'] = timed(bf.load_processed_data, processed_dir)
+    n_source_rows = len(df)
+    df, stages['driver_metrics_s'] = timed(bf.calculate_driver_metrics, df)
+    df, stages['constructor_metrics_s'] = timed(bf.calculate_constructor_metrics, df)
+    df, stages['encode_s'] = timed(bf.encode_categorical, df)
+    df, stages['finalize_s'] = timed(lambda d: bf.add_2026_regulation_dummy(d).fillna(0), df)
+    _, stages['write_csv_s'] = timed(df.to_csv, os.path.join(features_dir, "final_features.csv"), index=False)
+    _, stages['write_parquet_s'] = timed(bf.save_feature_store, df, features_dir)
+    _, stages['state_s'] = timed(
+        lambda: bf.save_feature_state(bf.build_feature_state(df, n_source_rows), features_dir))
+    stages['total_s'] = sum(stages.values())
+    return df, stages
+
+
+def bench_training(features_df, model_dir):
+    from src.models.train_model import train_model
+
+    n_train = int((features_df['year'] < 2024).sum())
+    n_test = int((features_df['year'] == 2024).sum())
+    assert n_train and n_test, f"empty train/test split ({n_train} train, {n_test} test rows)"
+    with contextlib.redirect_stdout(io.StringIO()):
+        model, train_s = timed(train_model, features_df)
+    model_path = os.path.join(model_dir, "xgb_winner_model.json")
+    model.save_model(model_path)
+    return model_path, train_s
+
+
+def _measure_load(model_path, features_path, evaluator):
+    """Runs in a fresh process so RSS reflects one loaded predictor."""
+    before = rss_mb()
+    started = time.perf_counter()
+    from src.pipeline.predict import F1Predictor
+    F1Predictor(model_path, features_path, evaluator=evaluator)
+    return time.perf_counter() - started, rss_mb(), rss_mb() - before
+
+
+def bench_load(model_path, features_path, evaluator):
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        load_s, rss, rss_delta = pool.submit(_measure_load, model_path, features_path, evaluator).result()
+    return {'load_s': load_s, 'rss_mb': rss, 'rss_delta_mb': rss_delta}
+
+
+def bench_predict(model_path, features_path, evaluator, n_single=200, n_batch=20):
+    from src.pipeline.predict import F1Predictor
+    from benchmarks.bench_batching import random_grids
+
+    predictor = F1Predictor(model_path, features_path, cache_size=0, evaluator=evaluator)
+    grids = random_grids(predictor, max(n_single, BATCH_GRIDS))
+    predictor.predict(grids[0])  # warm-up
+
+    single = []
+    for grid in grids[:n_single]:
+        single.append(timed(predictor.predict, grid)[1])
+    batch = [timed(predictor.predict_many, grids[:BATCH_GRIDS])[1] for _ in range(n_batch)]
+    return {
+        'predict_p50_ms': float(np.percentile(single, 50)) * 1e3,
+        'predict_p99_ms': float(np.percentile(single, 99)) * 1e3,
+        'batch_p50_ms': float(np.median(batch)) * 1e3,
+        'batch_grids': BATCH_GRIDS,
+    }
+
+
+def run_case(n_seasons, evaluator, seed=0):
+    with tempfile.TemporaryDirectory() as tmp:
+        processed_dir = os.path.join(tmp, "processed")
+        features_dir = os.path.join(tmp, "features")
+        os.makedirs(processed_dir)
+        os.makedirs(features_dir)
+        # n_seasons of history before 2024, which train_model holds out for testing
+        race_data = generate_race_data(n_seasons + 1, start_year=2024 - n_seasons, seed=seed)
+        race_data.to_csv(os.path.join(processed_dir, "race_data.csv"), index=False)
+
+        features_df, feature_stages = bench_features(processed_dir, features_dir)
+        model_path, train_s = bench_training(features_df, tmp)
+        features_path = os.path.join(features_dir, "final_features.parquet")
+        return {
+            'seasons': n_seasons,
+            'rows': len(race_data),
+            'features': feature_stages,
+            'train_s': train_s,
+            **bench_load(model_path, features_path, evaluator),
+            **bench_predict(model_path, features_path, evaluator),
+        }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    import xgboost
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'xgboost': xgboost.__version__,
+        'cpu_count': os.cpu_count(),
+        'machine': platform.machine(),
+    }
+
+
+def flatten(case):
+    """Metric name -> value, with nested feature stages as features.<stage>."""
+    flat = {}
+    for key, value in case.items():
+        if isinstance(value, dict):
+            flat.update({f"{key}.{k}": v for k, v in value.items()})
+        else:
+            flat[key] = value
+    return flat
+
+
+def compare(old, new):
+    """Prints every metric present in both runs with the new/old ratio."""
+    old_cases = {c['seasons']: flatten(c) for c in old['results']}
+    print(f"\nvs {old['environment'].get('commit')}:")
+    print(f"{'seasons':>8} {'metric':<28} {'old':>10} {'new':>10} {'ratio':>7}")
+    for case in new['results']:
+        before = old_cases.get(case['seasons'])
+        if before is None:
+            continue
+        for name, value in flatten(case).items():
+            if name in ('seasons', 'rows', 'batch_grids') or name not in before:
+                continue
+            ratio = value / before[name] if before[name] else float('nan')
+            print(f"{case['seasons']:>8} {name:<28} {before[name]:>10.4f} {value:>10.4f} {ratio:>6.2f}x")
+
+
+def print_report(results):
+    print(f"{'seasons':>8} {'rows':>8} {'features s':>10} {'train s':>8} {'load s':>7} "
+          f"{'rss MB':>7} {'p50 ms':>7} {'p99 ms':>7} {'batch ms':>9}")
+    for r in results:
+        print(f"{r['seasons']:>8} {r['rows']:>8} {r['features']['total_s']:>10.3f} {r['train_s']:>8.3f} "
+              f"{r['load_s']:>7.3f} {r['rss_mb']:>7.1f} {r['predict_p50_ms']:>7.2f} "
+              f"{r['predict_p99_ms']:>7.2f} {r['batch_p50_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic seasons.")
+    parser.add_argument("--seasons", type=int, nargs="+", default=SEASONS, help="History sizes (1-75).")
+    parser.add_argument("--evaluator", choices=["xgboost", "numpy"], default="xgboost")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join(BASE_DIR, "benchmarks", "results", "latest.json"))
+    parser.add_argument("--compare", help="Earlier results JSON to diff against.")
+    args = parser.parse_args()
+
+    results = []
+    for n_seasons in args.seasons:
+        print(f"Running {n_seasons} season(s)...", flush=True)
+        results.append(run_case(n_seasons, args.evaluator, args.seed))
+
+    report = {'environment': environment(), 'evaluator': args.evaluator, 'results': results}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print()
+    print_report(results)
+    print(f"\nSaved results to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
@@ -0,0 +1,80 @@
+"""
+Synthetic race data for benchmarks.
+
+    python -m benchmarks.synthetic --seasons 75 --output /tmp/race_data.csv
+"""
+import numpy as np
+import pandas as pd
+
+# Points for finishing positions 1-10 (current system)
+POINTS = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
+
+LOCATIONS = [
+    'Sakhir', 'Jeddah', 'Melbourne', 'Suzuka', 'Shanghai', 'Miami', 'Imola',
+    'Monaco', 'Montréal', 'Barcelona', 'Spielberg', 'Silverstone', 'Budapest',
+    'Spa-Francorchamps', 'Zandvoort', 'Monza', 'Baku', 'Marina Bay', 'Austin',
+    'Mexico City', 'São Paulo', 'Las Vegas', 'Lusail', 'Yas Island',
+]
+
+
+def generate_race_data(n_seasons, start_year=1950, rounds=22, n_drivers=20,
+                       n_constructors=10, seed=0):
+    """
+    Generates a synthetic DataFrame shaped like data/processed/race_data.csv.
+
+    Each season has `rounds` races with a full grid; a few drivers are
+    replaced every season so the driver pool grows with history, as it does
+    in the real data.
+    """
+    rng = np.random.default_rng(seed)
+    next_driver = n_drivers
+    drivers = np.arange(n_drivers)
+    frames = []
+    for s in range(n_seasons):
+        year = start_year + s
+        if s:
+            # Driver churn: replace three seats per season
+            seats = rng.choice(n_drivers, size=3, replace=False)
+            drivers = drivers.copy()
+            drivers[seats] = np.arange(next_driver, next_driver + 3)
+            next_driver += 3
+        teams = rng.permutation(np.repeat(np.arange(n_constructors), -(-n_drivers // n_constructors))[:n_drivers])
+        strength = rng.normal(size=n_drivers)
+        for rnd in range(1, rounds + 1):
+            grid = rng.permutation(n_drivers) + 1
+            finish = np.argsort(np.argsort(-(strength + rng.normal(scale=1.5, size=n_drivers)))) + 1
+            dnf = rng.random(n_drivers) < 0.1
+            position = np.where(dnf, np.nan, finish).astype(float)
+            points = np.where(~dnf & (finish <= len(POINTS)), np.take(POINTS, np.minimum(finish, len(POINTS)) - 1), 0).astype(float)
+            location = LOCATIONS[(rnd - 1) % len(LOCATIONS)]
+            frames.append(pd.DataFrame({
+                'raceId': f"{year}_{rnd}",
+                'year': year,
+                'round': rnd,
+                'driverId': [f"driver_{d}" for d in drivers],
+                'constructorId': [f"Team {t}" for t in teams],
+                'grid': grid.astype(float),
+                'positionOrder': position,
+                'points': points,
+                'status': np.where(dnf, 'Retired', 'Finished'),
+                'is_winner': (position == 1.0).astype(int),
+                'EventName': f"{location} Grand Prix",
+                'Location': location,
+                'Abbreviation': [f"D{d:02d}"[-3:] for d in drivers],
+            }))
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write synthetic race_data.csv-shaped data.")
+    parser.add_argument("--seasons", type=int, default=10, help="Number of seasons (1-75 covers 1950-2024).")
+    parser.add_argument("--end-year", type=int, default=2024)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="race_data.csv")
+    args = parser.parse_args()
+
+    df = generate_race_data(args.seasons, start_year=args.end_year - args.seasons + 1, seed=args.seed)
+    df.to_csv(args.output, index=False)
+    print(f"Wrote {len(df)} rows ({args.seasons} seasons) to {args.output}")
@@ -1,24 +1,122 @@
 import os
-import requests
+import json
+import hashlib
+import tempfile
 import zipfile
-import io
+import requests
+
+ERGAST_URL = "https://github.com/vopani/ergast-f1-api-csv/archive/refs/heads/main.zip"
+# Tables the pipeline reads (matched on file name inside the archive)
+DEFAULT_TABLES = ("races.csv", "results.csv")
+CHUNK_SIZE = 1 << 20
+STATE_FILE = ".ergast_download.json"
+
+def _load_state(output_dir):
+    path = os.path.join(output_dir, STATE_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+def _save_state(output_dir, state):
+    with open(os.path.join(output_dir, STATE_FILE), "w") as f:
+        json.dump(state, f, indent=2)
+
+def _local_path(url):
+    """Returns the filesystem path for file:// URLs and plain paths, else None."""
+    if url.startswith("file://"):
+        return url[len("file://"):]
+    if "://" not in url:
+        return url
+    return None
+
+def _stream_to_file(url, dest, etag=None):
+    """
+    Streams url to dest in chunks, hashing as it goes.
+    Returns (etag, sha256), or (etag, None) if the server says the archive
+    is unchanged (304 for the stored ETag).
+    """
+    digest = hashlib.sha256()
+    local = _local_path(url)
+    if local is not None:
+        # Local stand-in: mtime/size play the role of the ETag
+        st = os.stat(local)
+        new_etag = f"{st.st_mtime_ns}-{st.st_size}"
+        if etag == new_etag:
+            return new_etag, None
+        with open(local, "rb") as src, open(dest, "wb") as out:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                out.write(chunk)
+        return new_etag, digest.hexdigest()
 
-def download_ergast_data(output_dir):
-    """Downloads and extracts Ergast F1 data (CSV tables)."""
-    url = "https://github.com/vopani/ergast-f1-api-csv/archive/refs/heads/main.zip"
-    print(f"Downloading data from {url}...")
-    
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    
-    print("Extracting data...")
-    with zipfile.ZipFile(io.BytesIO(response.content)) as z:
-        z.extractall(output_dir)
-    
-    print(f"Data downloaded and extracted to {output_dir}")
+    if etag:
+        headers['If-None-Match'] = etag
+    with requests.get(url, headers=headers, stream=True, timeout=60) as response:
+        if response.status_code == 304:
+            return etag, None
+        response.raise_for_status()
+        with open(dest, "wb") as out:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                digest.update(chunk)
+                out.write(chunk)
+        return response.headers.get('ETag'), digest.hexdigest()
+
+def _extract_tables(archive_path, output_dir, tables):
+    """Extracts only the members whose file name is in tables (all CSVs if None)."""
+    extracted = []
+    with zipfile.ZipFile(archive_path) as z:
+        for member in z.infolist():
+            name = os.path.basename(member.filename)
+            if member.is_dir() or not name.endswith(".csv"):
+                continue
+            if tables is not None and name not in tables:
+                continue
+            z.extract(member, output_dir)  # streams the member to disk
+            extracted.append(member.filename)
+    return extracted
+
+def download_ergast_data(output_dir, url=ERGAST_URL, tables=DEFAULT_TABLES, force=False):
+    """
+    Downloads the Ergast F1 archive and extracts the CSV tables the pipeline uses.
+
+    The archive is streamed to a temporary file in chunks and members are
+    extracted one at a time, so memory use does not grow with the archive.
+    The ETag and SHA-256 of the last download are kept in output_dir; the
+    download is skipped when the server reports the same ETag, and the
+    extraction when the content hash matches. url may also be a local path
+    or file:// URL.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    tables = None if tables is None else sorted(tables)
+    state = {} if force else _load_state(output_dir)
+    same_request = state.get('url') == url and state.get('tables') == tables
+    outputs_present = all(os.path.exists(os.path.join(output_dir, p)) for p in state.get('files', []))
+
+    print(f"Downloading data from {url}...")
+    fd, archive_path = tempfile.mkstemp(suffix=".zip", dir=output_dir)
+    os.close(fd)
+    try:
+        etag = state.get('etag') if same_request and outputs_present else None
+        new_etag, sha256 = _stream_to_file(url, archive_path, etag)
+        if sha256 is None:
+            print("Archive unchanged (ETag match), skipping download.")
+            return state.get('files', [])
+        if same_request and outputs_present and sha256 == state.get('sha256'):
+            print("Archive unchanged (checksum match), skipping extraction.")
+            files = state.get('files', [])
+        else:
+            print("Extracting data...")
+            files = _extract_tables(archive_path, output_dir, tables)
+    finally:
+        os.remove(archive_path)
+
+    _save_state(output_dir, {'url': url, 'etag': new_etag, 'sha256': sha256, 'tables': tables, 'files': files})
+    print(f"Data downloaded and extracted to {output_dir} ({len(files)} tables)")
+    return files
 
 if __name__ == "__main__":
-    raw_data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "raw")
+    raw_data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "raw")
     os.makedirs(raw_data_dir, exist_ok=True)
     download_ergast_data(raw_data_dir)
@@ -1,75 +1,187 @@
-import fastf1
 import pandas as pd
 import os
 import time
+import argparse
+import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def fetch_data(start_year, end_year, output_dir):
-    """Fetches race results using FastF1."""
+# --- SESSION SOURCES ---
+# A source provides event schedules and race results. Ingestion only uses
+# these two methods, so it can run against FastF1 or, offline, against a
+# local copy of previously fetched CSVs.
+
+class FastF1Source:
+    """Fetches schedules and race results from FastF1 (with its on-disk cache)."""
+
+    def __init__(self, cache_dir=None):
+        import fastf1
+        self.fastf1 = fastf1
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            fastf1.Cache.enable_cache(cache_dir)
+
+    def get_event_schedule(self, year):
+        return self.fastf1.get_event_schedule(year)
+
+    def get_results(self, year, round_number):
+        session = self.fastf1.get_session(year, round_number, 'R')
+        session.load(laps=False, telemetry=False, weather=False, messages=False) # Load only results
+        return session.results
+
+
+class LocalSource:
+    """Serves schedules and results from existing races.csv/results.csv files."""
+
+    def __init__(self, data_dir):
+        self.races = pd.read_csv(os.path.join(data_dir, "races.csv"))
+        self.results = pd.read_csv(os.path.join(data_dir, "results.csv"))
+
+    def get_event_schedule(self, year):
+        schedule = self.races[self.races['year'] == year]
+        if schedule.empty:
+            raise ValueError(f"No schedule for {year} in local data")
+        return schedule.drop(columns=['year']).reset_index(drop=True)
+
+    def get_results(self, year, round_number):
+        res = self.results[(self.results['year'] == year) & (self.results['round'] == round_number)]
+        if res.empty:
+            raise ValueError(f"No results for {year} round {round_number} in local data")
+        return res.drop(columns=['raceId', 'year', 'round']).reset_index(drop=True)
+
+# --- INGESTION ---
+
+def _write_atomic(df, path):
+    tmp_path = path + ".tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def _merge_checkpoints(paths, output_path):
+    """Concatenates checkpoint CSVs into one file without holding them all in memory."""
+    columns = None
+    tmp_path = output_path + ".tmp"
+    rows = 0
+    for path in paths:
+        df = pd.read_csv(path)
+        if columns is None:
+            columns = df.columns.tolist()
+            df.to_csv(tmp_path, index=False)
+        else:
+            df.reindex(columns=columns).to_csv(tmp_path, mode='a', header=False, index=False)
+        rows += len(df)
+    if columns is not None:
+        os.replace(tmp_path, output_path)
+    return rows
+
+def _fetch_race(source, year, round_number, path):
+    res = source.get_results(year, round_number)
+    if res is None or res.empty:
+        # Not run yet, or results not published: leave no checkpoint so it is retried
+        raise ValueError(f"no results for {year} round {round_number}")
+    res['raceId'] = f"{year}_{round_number}"
+    res['year'] = year
+    res['round'] = round_number
+    _write_atomic(res, path)
+    return len(res)
+
+def fetch_data(start_year, end_year, output_dir, source=None, workers=4, checkpoint_dir=None):
+    """
+    Fetches event schedules and race results, one checkpoint file per race.
+
+    Schedules are fetched once per year, then every conventional race is
+    loaded on a bounded thread pool and written to its own checkpoint CSV.
+    Races (and past schedules) already checkpointed are skipped, so an
+    interrupted run resumes where it stopped; failures and races without
+    results yet are reported and retried on the next run. The current
+    season's schedule is refetched every run, since it can still change.
+    races.csv and results.csv are assembled from the checkpoints at the end.
+    """
     os.makedirs(output_dir, exist_ok=True)
-    
-    all_races = []
-    all_results = []
-    
+    source = source or FastF1Source()
+    checkpoint_dir = checkpoint_dir or os.path.join(output_dir, "checkpoints")
+    schedule_dir = os.path.join(checkpoint_dir, "schedules")
+    results_dir = os.path.join(checkpoint_dir, "results")
+    os.makedirs(schedule_dir, exist_ok=True)
+    os.makedirs(results_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    current_year = datetime.date.today().year
+    schedule_paths = []
+    races = []
     for year in range(start_year, end_year + 1):
-        print(f"Fetching data for {year}...")
-        try:
-            schedule = fastf1.get_event_schedule(year)
-            # Save schedule
-            schedule['year'] = year
-            all_races.append(schedule)
-            
-            # For each race, get results
-            # Note: Fetching full results for every race takes time.
-            # We will just save the schedule for now and maybe results for recent years?
-            # Or we can try to use the ergast interface within fastf1 if available?
-            # FastF1 v3.1+ has ergast interface? No, it uses it internally.
-            
-            # Let's try to get results for each race.
-            # This might be too slow for 70 years in one go.
-            # We will do it for the requested range.
-            pass
-        except Exception as e:
-            print(f"Error fetching {year}: {e}")
-            
+        path = os.path.join(schedule_dir, f"{year}.csv")
+        cached = os.path.exists(path)
+        if not cached or year >= current_year:
+            print(f"Fetching schedule for {year}...")
+            try:
+                schedule = source.get_event_schedule(year)
+            except Exception as e:
+                print(f"Error fetching {year}: {e}")
+                if not cached:
+                    continue
+            else:
+                # Save schedule
+                schedule['year'] = year
+                _write_atomic(schedule, path)
+        schedule_paths.append(path)
+        schedule = pd.read_csv(path, usecols=['RoundNumber', 'EventName', 'EventFormat'])
+        for _, row in schedule[schedule['EventFormat'] == 'conventional'].iterrows(): # Skip testing etc
+            races.append((year, int(row['RoundNumber']), row['EventName']))
+
+    pending = []
+    for year, round_number, race_name in races:
+        path = os.path.join(results_dir, f"{year}_{round_number:02d}.csv")
+        if not os.path.exists(path):
+            pending.append((year, round_number, race_name, path))
+    print(f"{len(races)} races, {len(races) - len(pending)} already on disk, fetching {len(pending)}...")
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_fetch_race, source, year, round_number, path): (year, race_name)
+            for year, round_number, race_name, path in pending
+        }
+        for future in as_completed(futures):
+            year, race_name = futures[future]
+            try:
+                n = future.result()
+                print(f"  Fetched {race_name} {year} ({n} rows)")
+            except Exception as e:
+                failed += 1
+                print(f"  Error fetching {race_name} {year}: {e}")
+
     # Concatenate and save
-    if all_races:
-        races_df = pd.concat(all_races)
-        races_df.to_csv(os.path.join(output_dir, "races.csv"), index=False)
-        print(f"Saved races.csv with {len(races_df)} rows.")
-
-    # To get actual results (drivers, positions), we need to loop through events.
-    # This is heavy. 
-    # Alternative: Use a direct Ergast API call loop if the bulk download failed.
-    # The API is rate limited but works.
-    
-    # Let's try to fetch results for the last 5 years to demonstrate.
-    # For the full history, we really needed that CSV dump.
-    # I will try to fetch the last 5 years of results.
-    
-    results_list = []
-    for year in range(max(start_year, 2020), end_year + 1):
-        schedule = fastf1.get_event_schedule(year)
-        for i, row in schedule.iterrows():
-            if row['EventFormat'] == 'conventional': # Skip testing etc
-                try:
-                    race_name = row['EventName']
-                    print(f"  Fetching {race_name} {year}...")
-                    session = fastf1.get_session(year, row['RoundNumber'], 'R')
-                    session.load(laps=False, telemetry=False, weather=False, messages=False) # Load only results
-                    res = session.results
-                    res['raceId'] = f"{year}_{row['RoundNumber']}"
-                    res['year'] = year
-                    res['round'] = row['RoundNumber']
-                    results_list.append(res)
-                except Exception as e:
-                    print(f"  Error fetching {race_name}: {e}")
-    
-    if results_list:
-        results_df = pd.concat(results_list)
-        results_df.to_csv(os.path.join(output_dir, "results.csv"), index=False)
-        print(f"Saved results.csv with {len(results_df)} rows.")
+    n = _merge_checkpoints(schedule_paths, os.path.join(output_dir, "races.csv"))
+    print(f"Saved races.csv with {n} rows.")
+
+    result_paths = [
+        os.path.join(results_dir, f"{year}_{round_number:02d}.csv")
+        for year, round_number, _ in races
+    ]
+    result_paths = [p for p in result_paths if os.path.exists(p)]
+    n = _merge_checkpoints(result_paths, os.path.join(output_dir, "results.csv"))
+    print(f"Saved results.csv with {n} rows.")
+    print(f"Done in {time.perf_counter() - started:.1f}s ({failed} races failed, rerun to retry).")
+    return failed
 
 if __name__ == "__main__":
-    raw_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "raw")
-    # Fetching 2023-2024 for demonstration as full history takes too long interactively
-    fetch_data(2023, 2024, raw_dir)
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    raw_dir = os.path.join(base_dir, "data", "raw")
+
+    parser = argparse.ArgumentParser(description="Fetch F1 schedules and race results.")
+    # Fetching 2023-2024 by default; wider ranges resume from checkpoints
+    parser.add_argument("--start", type=int, default=2023)
+    parser.add_argument("--end", type=int, default=2024)
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent session loads.")
+    parser.add_argument("--output-dir", default=raw_dir)
+    parser.add_argument("--source", choices=["fastf1", "local"], default="fastf1")
+    parser.add_argument("--local-dir", default=raw_dir,
+                        help="Directory with races.csv/results.csv for --source local.")
+    parser.add_argument("--cache-dir", default=os.path.join(base_dir, "data", "cache", "fastf1"),
+                        help="FastF1 session cache directory.")
+    args = parser.parse_args()
+
+    if args.source == "local":
+        source = LocalSource(args.local_dir)
+    else:
+        source = FastF1Source(args.cache_dir)
+    fetch_data(args.start, args.end, args.output_dir, source=source, workers=args.workers)
@@ -48,7 +48,7 @@ def process_data(data):
     }, inplace=True)
     
     # Create Winner Target
-    df['is_winner'] = df['positionOrder'].apply(lambda x: 1 if x == 1.0 else 0)
+    df['is_winner'] = (df['positionOrder'] == 1.0).astype(int)
     
     # Convert Time to milliseconds (if possible)
     # FastF1 Time is usually a Timedelta string or object.
@@ -1,6 +1,9 @@
 import pandas as pd
 import numpy as np
 import os
+import json
+import shutil
+import argparse
 
 def load_processed_data(processed_data_dir):
     """Loads processed race data."""
@@ -10,42 +13,108 @@ def load_processed_data(processed_data_dir):
     else:
         raise FileNotFoundError(f"{path} not found.")
 
-def calculate_driver_metrics(df):
+# Rolling windows (in races) for the recent-form features. The 3-race
+# window keeps the original column names; others get a _<window> suffix.
+RECENT_WINDOWS = (3,)
+
+def recent_column(name, window):
+    return name if window == 3 else f"{name}_{window}"
+
+def group_history_stats(keys, wins, values, windows=RECENT_WINDOWS):
+    """
+    Per-group statistics over each row's *previous* rows, for data already in
+    time order.
+
+    Rows are stably sorted by group so every group is a contiguous block; the
+    cumulative counts and the rolling means are then differences of running
+    sums between a row and its group start (or the row `window` places back).
+    This replaces groupby().cumsum()/cumcount() and the per-group
+    shift(1).rolling(window, min_periods=1).mean() lambdas with a few array
+    passes for all windows at once. NaN values are skipped in the means and
+    rows with a missing key get NaN, as with groupby.
+
+    Returns (wins_before, races_before, {window: mean_of_previous_values}).
+    """
+    codes, _ = pd.factorize(np.asarray(keys), use_na_sentinel=True)
+    wins = np.asarray(wins)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(codes)
+
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    starts = np.flatnonzero(is_start)
+    group_start = np.repeat(starts, np.diff(np.append(starts, n)))
+    pos = np.arange(n)
+
+    # Running sums with a leading zero, so sum(rows[a:b]) == S[b] - S[a]
+    win_sums = np.concatenate([[0], np.cumsum(wins[order])])
+    v = values[order]
+    valid = ~np.isnan(v)
+    value_sums = np.concatenate([[0.0], np.cumsum(np.where(valid, v, 0.0))])
+    value_counts = np.concatenate([[0], np.cumsum(valid)])
+
+    wins_before = win_sums[pos] - win_sums[group_start]
+    races_before = pos - group_start
+
+    means = {}
+    for window in windows:
+        lo = np.maximum(group_start, pos - window)
+        count = value_counts[pos] - value_counts[lo]
+        total = value_sums[pos] - value_sums[lo]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means[window] = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+    # Scatter back to the original row order
+    inverse = np.empty(n, dtype=np.intp)
+    inverse[order] = pos
+    wins_before = wins_before[inverse]
+    races_before = races_before[inverse]
+    means = {w: m[inverse] for w, m in means.items()}
+
+    missing = codes < 0
+    if missing.any():
+        wins_before = np.where(missing, np.nan, wins_before)
+        races_before = np.where(missing, np.nan, races_before)
+        means = {w: np.where(missing, np.nan, m) for w, m in means.items()}
+    return wins_before, races_before, means
+
+def calculate_driver_metrics(df, windows=RECENT_WINDOWS):
     """Calculates cumulative driver performance metrics."""
     # Sort by date
     df = df.sort_values(['year', 'round'])
     
+    # Recent Form (Avg position over the last races)
+    # positionOrder is numeric in FastF1 (float), DNFs may be missing
+    position_numeric = pd.to_numeric(df['positionOrder'], errors='coerce').fillna(20) # Treat DNF as 20
+    wins, races, recent = group_history_stats(df['driverId'], df['is_winner'], position_numeric, windows)
+    
     # Cumulative Wins
-    df['driver_wins_cum'] = df.groupby('driverId')['is_winner'].cumsum() - df['is_winner']
-    df['driver_races_cum'] = df.groupby('driverId').cumcount()
+    df['driver_wins_cum'] = wins
+    df['driver_races_cum'] = races
     df['driver_win_rate'] = df['driver_wins_cum'] / df['driver_races_cum'].replace(0, 1)
     
-    # Recent Form (Avg position last 3 races)
-    # We need to handle DNFs or use positionOrder
-    # positionOrder is usually numeric, but might be string if DNF?
-    # In FastF1, Position is float.
-    
-    df['position_numeric'] = pd.to_numeric(df['positionOrder'], errors='coerce').fillna(20) # Treat DNF as 20
-    
-    df['driver_recent_form'] = df.groupby('driverId')['position_numeric'].transform(
-        lambda x: x.shift(1).rolling(window=3, min_periods=1).mean()
-    )
+    df['position_numeric'] = position_numeric
+    for window in windows:
+        df[recent_column('driver_recent_form', window)] = recent[window]
     
     return df
 
-def calculate_constructor_metrics(df):
+def calculate_constructor_metrics(df, windows=RECENT_WINDOWS):
     """Calculates cumulative constructor performance metrics."""
     df = df.sort_values(['year', 'round'])
     
+    wins, races, recent = group_history_stats(df['constructorId'], df['is_winner'], df['points'], windows)
+    
     # Cumulative Wins
-    df['constructor_wins_cum'] = df.groupby('constructorId')['is_winner'].cumsum() - df['is_winner']
-    df['constructor_races_cum'] = df.groupby('constructorId').cumcount()
+    df['constructor_wins_cum'] = wins
+    df['constructor_races_cum'] = races
     df['constructor_win_rate'] = df['constructor_wins_cum'] / df['constructor_races_cum'].replace(0, 1)
     
-    # Recent Form (Avg points last 3 races)
-    df['constructor_recent_points'] = df.groupby('constructorId')['points'].transform(
-        lambda x: x.shift(1).rolling(window=3, min_periods=1).mean()
-    )
+    # Recent Form (Avg points over the last races)
+    for window in windows:
+        df[recent_column('constructor_recent_points', window)] = recent[window]
     
     return df
 
@@ -62,26 +131,95 @@ def encode_categorical(df):
     
     return df
 
+# String columns stored as categoricals in the columnar feature store
+CATEGORICAL_COLUMNS = [
+    'raceId', 'driverId', 'constructorId', 'status',
+    'EventName', 'Location', 'Abbreviation'
+]
+
+# The store is a Parquet dataset directory (final_features.parquet/) of
+# part files read in name order, so incremental updates add a part instead
+# of rewriting the history. pd.read_parquet reads it like a single file.
+STORE_NAME = "final_features.parquet"
+PART_FORMAT = "part-{:05d}.parquet"
+
+def _store_table(df, schema=None):
+    """
+    Arrow table for a store part. String columns are dictionaries and label
+    codes int32 with fixed index widths, so parts written at different
+    times (with more categories) share one schema.
+    """
+    import pyarrow as pa
+    store = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in store.columns:
+            store[col] = store[col].astype('category')
+    table = pa.Table.from_pandas(store, preserve_index=False)
+    if schema is None:
+        encoded = dict(ENCODED_COLUMNS).values()
+        schema = pa.schema([
+            pa.field(f.name, pa.dictionary(pa.int32(), pa.string())) if f.name in CATEGORICAL_COLUMNS
+            else pa.field(f.name, pa.int32()) if f.name in encoded
+            else f
+            for f in table.schema
+        ])
+    return table.cast(schema)
+
+def _write_part(table, path):
+    import pyarrow.parquet as pq
+    # Dot-prefixed while being written, so readers never see a partial part
+    tmp_path = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".tmp")
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+def save_feature_store(df, features_dir):
+    """Writes the feature set as a typed Parquet dataset (one part) next to the CSV."""
+    path = os.path.join(features_dir, STORE_NAME)
+    staging = os.path.join(features_dir, "." + STORE_NAME + ".new")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    _write_part(_store_table(df), os.path.join(staging, PART_FORMAT.format(0)))
+    # Swap the new dataset in; a single-file store from older builds is replaced too
+    old = os.path.join(features_dir, "." + STORE_NAME + ".old")
+    if os.path.exists(path):
+        os.rename(path, old)
+    os.rename(staging, path)
+    if os.path.isdir(old):
+        shutil.rmtree(old)
+    elif os.path.exists(old):
+        os.remove(old)
+    return path
+
+def append_feature_store(new_df, features_dir):
+    """
+    Adds new_df as the next part of the store, cast to the existing parts'
+    schema; the cost depends only on the new rows. A store still in the
+    single-file layout is converted to a dataset directory first (once).
+    """
+    import pyarrow.parquet as pq
+    path = os.path.join(features_dir, STORE_NAME)
+    if not os.path.isdir(path):
+        print(f"Converting {path} to a Parquet dataset directory (one-time full rewrite)...")
+        save_feature_store(pd.read_parquet(path), features_dir)
+    parts = sorted(f for f in os.listdir(path) if f.startswith("part-") and f.endswith(".parquet"))
+    schema = pq.read_schema(os.path.join(path, parts[-1]))
+    part_path = os.path.join(path, PART_FORMAT.format(len(parts)))
+    _write_part(_store_table(new_df, schema), part_path)
+    return part_path
+
 def add_2026_regulation_dummy(df):
     """Adds a dummy feature for regulation changes."""
     # 2026 is not in data, but we add the column for future inference
     df['regulation_change'] = 0
     return df
 
-if __name__ == "__main__":
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    processed_dir = os.path.join(base_dir, "data", "processed")
-    features_dir = os.path.join(base_dir, "data", "features")
-    os.makedirs(features_dir, exist_ok=True)
-    
-    print("Loading data...")
-    df = load_processed_data(processed_dir)
-    
+def build_all_features(df, windows=RECENT_WINDOWS):
+    """Runs the full (batch) feature computation over the processed race data."""
     print("Calculating Driver Metrics...")
-    df = calculate_driver_metrics(df)
+    df = calculate_driver_metrics(df, windows)
     
     print("Calculating Constructor Metrics...")
-    df = calculate_constructor_metrics(df)
+    df = calculate_constructor_metrics(df, windows)
     
     print("Encoding Features...")
     df = encode_categorical(df)
@@ -90,9 +228,233 @@ if __name__ == "__main__":
     df = add_2026_regulation_dummy(df)
     
     # Fill NaNs
-    df = df.fillna(0)
+    return df.fillna(0)
+
+# --- INCREMENTAL MODE ---
+# Running state persisted after each build so new rounds can be appended
+# without recomputing the whole history. Each entity keeps its cumulative
+# wins, race count and the last max(windows) values of its form metric,
+# which is exactly what the batch cumulative and rolling features need.
+
+STATE_FILE = "feature_state.json"
+
+# (source column, encoded column) pairs produced by encode_categorical
+ENCODED_COLUMNS = [
+    ('Location', 'location_id'),
+    ('constructorId', 'constructor_id_enc'),
+    ('driverId', 'driver_id_enc'),
+]
+
+def _entity_state(df, key, value_col, depth):
+    """Per-entity wins, race count and last `depth` values of value_col."""
+    grouped = df.groupby(key, sort=False)
+    wins = grouped['is_winner'].sum()
+    races = grouped.size()
+    windows = grouped[value_col].apply(lambda x: x.tail(depth).tolist())
+    return {
+        k: {'wins': int(wins[k]), 'races': int(races[k]), 'window': windows[k]}
+        for k in races.index
+    }
+
+def build_feature_state(features_df, n_source_rows, windows=RECENT_WINDOWS):
+    """Derives the incremental state from a complete feature table."""
+    last = features_df.iloc[-1] if len(features_df) else None
+    depth = max(windows)
+    return {
+        'n_source_rows': int(n_source_rows),
+        'windows': list(windows),
+        'last_key': [int(last['year']), int(last['round'])] if last is not None else None,
+        'columns': features_df.columns.tolist(),
+        'dtypes': {
+            c: str(t) for c, t in features_df.dtypes.items()
+            if t.kind in 'biuf' and c not in dict(ENCODED_COLUMNS).values()
+        },
+        'categories': {
+            src: sorted(features_df[src].dropna().unique().tolist())
+            for src, _ in ENCODED_COLUMNS
+        },
+        'drivers': _entity_state(features_df, 'driverId', 'position_numeric', depth),
+        'constructors': _entity_state(features_df, 'constructorId', 'points', depth),
+    }
+
+def save_feature_state(state, features_dir):
+    path = os.path.join(features_dir, STATE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+def load_feature_state(features_dir):
+    path = os.path.join(features_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _window_mean(window):
+    """Mean of the non-NaN values, NaN if there are none (as rolling() does)."""
+    values = [v for v in window if not pd.isna(v)]
+    return sum(values) / len(values) if values else np.nan
+
+def _advance(entities, key, is_winner, value, windows):
+    """Returns the pre-race (wins, races, *recent means) for key and records the race."""
+    entry = entities.setdefault(key, {'wins': 0, 'races': 0, 'window': []})
+    before = (entry['wins'], entry['races'], *(_window_mean(entry['window'][-w:]) for w in windows))
+    entry['wins'] += int(is_winner)
+    entry['races'] += 1
+    entry['window'] = (entry['window'] + [value])[-max(windows):]
+    return before
+
+def compute_incremental_features(new_df, state):
+    """
+    Computes features for new race rows from the running state.
+    Rows must come after everything already in the state; the state is
+    updated in place. Encoded columns are filled by the caller.
+    """
+    df = new_df.sort_values(['year', 'round']).copy()
+    df['position_numeric'] = pd.to_numeric(df['positionOrder'], errors='coerce').fillna(20)
+
+    windows = state.get('windows', list(RECENT_WINDOWS))
+    driver_rows = [
+        _advance(state['drivers'], d, w, p, windows)
+        for d, w, p in zip(df['driverId'], df['is_winner'], df['position_numeric'])
+    ]
+    constructor_rows = [
+        _advance(state['constructors'], c, w, p, windows)
+        for c, w, p in zip(df['constructorId'], df['is_winner'], df['points'])
+    ]
+
+    wins, races, *recent = np.array(driver_rows, dtype=float).reshape(-1, 2 + len(windows)).T
+    df['driver_wins_cum'] = wins
+    df['driver_races_cum'] = races
+    df['driver_win_rate'] = df['driver_wins_cum'] / df['driver_races_cum'].replace(0, 1)
+    for window, values in zip(windows, recent):
+        df[recent_column('driver_recent_form', window)] = values
+
+    wins, races, *recent = np.array(constructor_rows, dtype=float).reshape(-1, 2 + len(windows)).T
+    df['constructor_wins_cum'] = wins
+    df['constructor_races_cum'] = races
+    df['constructor_win_rate'] = df['constructor_wins_cum'] / df['constructor_races_cum'].replace(0, 1)
+    for window, values in zip(windows, recent):
+        df[recent_column('constructor_recent_points', window)] = values
+
+    df = add_2026_regulation_dummy(df)
+
+    last = df.iloc[-1]
+    state['last_key'] = [int(last['year']), int(last['round'])]
+    return df
+
+def _apply_encodings(df, categories):
+    """Label-encodes like encode_categorical, against the given category lists."""
+    for src, enc in ENCODED_COLUMNS:
+        df[enc] = pd.Categorical(df[src], categories=categories[src]).codes
+    return df
+
+def _read_features(features_dir):
+    """Reads the current feature table, preferring the Parquet store, with plain string columns."""
+    store_path = os.path.join(features_dir, STORE_NAME)
+    if os.path.exists(store_path):
+        df = pd.read_parquet(store_path)
+        for col in CATEGORICAL_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype(object)
+        return df
+    # round_trip keeps rewritten floats byte-identical to the batch output
+    return pd.read_csv(os.path.join(features_dir, "final_features.csv"), float_precision='round_trip')
+
+def update_features(processed_dir, features_dir):
+    """
+    Appends features for race rows added to race_data.csv since the last build.
+    Falls back to a full rebuild when there is no state or when the new rows
+    are not strictly after the last processed round.
+    """
+    csv_path = os.path.join(features_dir, "final_features.csv")
+    state = load_feature_state(features_dir)
+    if state is None or not os.path.exists(csv_path):
+        print("No incremental state found, running full build...")
+        return full_build(processed_dir, features_dir)
+
+    # Skip the rows already folded into the state instead of parsing them
+    path = os.path.join(processed_dir, "race_data.csv")
+    new_df = pd.read_csv(path, skiprows=range(1, state['n_source_rows'] + 1))
+    if new_df.empty:
+        print("No new rows to process.")
+        return None
+
+    keys = list(zip(new_df['year'], new_df['round']))
+    if state['last_key'] is not None and min(keys) <= tuple(state['last_key']):
+        print("New rows overlap processed rounds, running full build...")
+        return full_build(processed_dir, features_dir)
+
+    print(f"Computing features for {len(new_df)} new rows...")
+    state['n_source_rows'] += len(new_df)
+    new_features = compute_incremental_features(new_df, state)
+
+    # Label codes are positions in the sorted category list. New values that
+    # sort after every known one just take the next codes; one that sorts
+    # in between shifts existing codes, and only then is the history rewritten.
+    categories = {
+        src: sorted(set(state['categories'][src]) | set(new_features[src].dropna()))
+        for src, _ in ENCODED_COLUMNS
+    }
+    shifted = [
+        src for src, _ in ENCODED_COLUMNS
+        if categories[src][:len(state['categories'][src])] != state['categories'][src]
+    ]
+    state['categories'] = categories
+
+    new_features = _apply_encodings(new_features, categories).fillna(0)
+    new_features = new_features[state['columns']].astype(state['dtypes'])
+
+    store_path = os.path.join(features_dir, STORE_NAME)
+    if shifted:
+        print(f"New {', '.join(shifted)} values shift existing label codes, "
+              f"re-encoding and rewriting the full feature history...")
+        df = _apply_encodings(pd.concat([_read_features(features_dir), new_features], ignore_index=True), categories)
+        df.to_csv(csv_path, index=False)
+        if os.path.exists(store_path):
+            save_feature_store(df, features_dir)
+    else:
+        new_features.to_csv(csv_path, mode='a', header=False, index=False)
+        if os.path.exists(store_path):
+            append_feature_store(new_features, features_dir)
+    save_feature_state(state, features_dir)
+    print(f"Appended {len(new_features)} rows to {csv_path}.")
+    return new_features
+
+def full_build(processed_dir, features_dir, windows=RECENT_WINDOWS):
+    """Recomputes every feature from race_data.csv and resets the incremental state."""
+    print("Loading data...")
+    df = load_processed_data(processed_dir)
+    n_source_rows = len(df)
+
+    df = build_all_features(df, windows)
     
     # Save feature set
     output_path = os.path.join(features_dir, "final_features.csv")
     df.to_csv(output_path, index=False)
     print(f"Saved features to {output_path} with {len(df)} rows.")
+
+    store_path = save_feature_store(df, features_dir)
+    print(f"Saved columnar feature store to {store_path}.")
+
+    save_feature_state(build_feature_state(df, n_source_rows, windows), features_dir)
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build model features from processed race data.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only compute features for rounds added since the last build.")
+    parser.add_argument("--windows", type=int, nargs="+", default=list(RECENT_WINDOWS),
+                        help="Recent-form window sizes in races (full build only; 3 is the model's).")
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    processed_dir = os.path.join(base_dir, "data", "processed")
+    features_dir = os.path.join(base_dir, "data", "features")
+    os.makedirs(features_dir, exist_ok=True)
+    
+    if args.incremental:
+        update_features(processed_dir, features_dir)
+    else:
+        full_build(processed_dir, features_dir, tuple(args.windows))
@@ -0,0 +1,171 @@
+"""
+Walk-forward backtest for the race winner model.
+
+Before every round the model is retrained on all earlier rounds only, then
+scores that round. Folds are spread over a process pool. In 'cold' mode
+every fold is an independent full refit; in 'warm' mode the rounds are cut
+into fixed blocks of refit_every rounds, each fitted once at its start and
+then continued from the previous booster (xgb_model) with a few extra
+trees per round, which is much cheaper than refitting. The blocks, not the
+worker count, decide where refits happen, so results don't depend on the
+pool size.
+
+    python -m src.models.backtest [--mode warm] [--workers 4] [--scaling]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.metrics import log_loss, brier_score_loss
+
+from src.models.train_model import FEATURES, TARGET, load_features
+
+# Same model as train_model, via the native API
+PARAMS = {
+    'objective': 'binary:logistic',
+    'eta': 0.1,
+    'max_depth': 5,
+    'eval_metric': 'logloss',
+    'nthread': 1,  # parallelism comes from the fold pool
+}
+NUM_BOOST_ROUND = 100
+
+# Shared with pool workers through the initializer, not pickled per fold
+_X = _y = _round_idx = None
+
+
+def _init_worker(X, y, round_idx):
+    global _X, _y, _round_idx
+    _X, _y, _round_idx = X, y, round_idx
+
+
+def _fit(k, booster=None, extra_rounds=None):
+    train = _round_idx < k
+    dtrain = xgb.DMatrix(_X[train], label=_y[train], feature_names=FEATURES)
+    if booster is None:
+        return xgb.train(PARAMS, dtrain, NUM_BOOST_ROUND)
+    return xgb.train(PARAMS, dtrain, extra_rounds, xgb_model=booster)
+
+
+def _score(booster, k):
+    test = _round_idx == k
+    return booster.predict(xgb.DMatrix(_X[test], feature_names=FEATURES))
+
+
+def _cold_fold(k):
+    return [(k, _score(_fit(k), k))]
+
+
+def _warm_block(ks, extra_rounds):
+    booster = None
+    out = []
+    for k in ks:
+        booster = _fit(k, booster, extra_rounds)
+        out.append((k, _score(booster, k)))
+    return out
+
+
+def round_metrics(y_true, probs):
+    """Log loss, Brier score and whether the top-ranked driver won."""
+    has_winner = y_true.sum() > 0
+    return {
+        'log_loss': log_loss(y_true, probs, labels=[0, 1]),
+        'brier': brier_score_loss(y_true, probs),
+        'top1_hit': float(y_true[np.argmax(probs)] == 1) if has_winner else np.nan,
+    }
+
+
+def walk_forward(df, mode='cold', workers=None, min_train_rounds=5, extra_rounds=10, refit_every=5):
+    """
+    Runs the backtest and returns one row of metrics per scored round.
+    The first min_train_rounds rounds are only used for training.
+    """
+    df = df.sort_values(['year', 'round'], kind='stable').reset_index(drop=True)
+    keys = list(zip(df['year'], df['round']))
+    rounds = sorted(set(keys))
+    position = {k: i for i, k in enumerate(rounds)}
+    round_idx = np.array([position[k] for k in keys])
+    X = df[FEATURES].to_numpy(dtype=np.float32)
+    y = df[TARGET].to_numpy()
+
+    folds = list(range(min_train_rounds, len(rounds)))
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(X, y, round_idx)) as pool:
+        if mode == 'cold':
+            batches = pool.map(_cold_fold, folds)
+        elif mode == 'warm':
+            blocks = [folds[i:i + refit_every] for i in range(0, len(folds), refit_every)]
+            batches = pool.map(_warm_block, blocks, [extra_rounds] * len(blocks))
+        else:
+            raise ValueError(f"Unknown mode {mode}")
+        scored = [item for batch in batches for item in batch]
+
+    rows = []
+    for k, probs in sorted(scored, key=lambda item: item[0]):
+        year, rnd = rounds[k]
+        y_true = y[round_idx == k]
+        rows.append({'year': year, 'round': rnd, 'n_train': int((round_idx < k).sum()),
+                     **round_metrics(y_true, probs)})
+    return pd.DataFrame(rows)
+
+
+def summarize(results):
+    return {
+        'rounds': len(results),
+        'log_loss': results['log_loss'].mean(),
+        'brier': results['brier'].mean(),
+        'top1_hit_rate': results['top1_hit'].mean(),
+    }
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    features_dir = os.path.join(base_dir, "data", "features")
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtest with per-round retraining.")
+    parser.add_argument("--mode", choices=["cold", "warm"], default="cold")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--min-train-rounds", type=int, default=5)
+    parser.add_argument("--extra-rounds", type=int, default=10,
+                        help="Trees added per round in warm mode.")
+    parser.add_argument("--refit-every", type=int, default=5,
+                        help="Rounds between full refits in warm mode.")
+    parser.add_argument("--output", help="Write per-round metrics to this CSV.")
+    parser.add_argument("--scaling", action="store_true",
+                        help="Time both modes with 1..cpu_count workers.")
+    args = parser.parse_args()
+
+    df = load_features(features_dir, ['year', 'round'] + FEATURES + [TARGET])
+
+    if args.scaling:
+        counts = sorted({1, 2, 4, 8, os.cpu_count() or 1})
+        counts = [c for c in counts if c <= (os.cpu_count() or 1)] or [1]
+        print(f"{'mode':>6} {'workers':>8} {'seconds':>8} {'speedup':>8} {'log_loss':>9}")
+        for mode in ["cold", "warm"]:
+            base = None
+            for workers in counts:
+                started = time.perf_counter()
+                res = walk_forward(df, mode, workers, args.min_train_rounds, args.extra_rounds,
+                                   args.refit_every)
+                elapsed = time.perf_counter() - started
+                base = base or elapsed
+                print(f"{mode:>6} {workers:>8} {elapsed:>8.2f} {base / elapsed:>7.2f}x "
+                      f"{res['log_loss'].mean():>9.4f}")
+    else:
+        started = time.perf_counter()
+        results = walk_forward(df, args.mode, args.workers, args.min_train_rounds, args.extra_rounds,
+                               args.refit_every)
+        elapsed = time.perf_counter() - started
+        print(results.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        summary = summarize(results)
+        print(f"\n{summary['rounds']} rounds in {elapsed:.2f}s ({args.mode}): "
+              f"log loss {summary['log_loss']:.4f}, Brier {summary['brier']:.4f}, "
+              f"top-1 hit rate {summary['top1_hit_rate']:.3f}")
+        if args.output:
+            results.to_csv(args.output, index=False)
+            print(f"Saved per-round metrics to {args.output}")
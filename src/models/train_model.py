@@ -1,15 +1,52 @@
 import pandas as pd
+import numpy as np
 import xgboost as xgb
 from sklearn.metrics import accuracy_score, classification_report, log_loss
 import os
+import time
 import pickle
+import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
 
-def load_features(features_dir):
-    """Loads feature dataset."""
+FEATURES = [
+    'grid', 'driver_win_rate', 'driver_recent_form',
+    'constructor_win_rate', 'constructor_recent_points',
+    'location_id', 'driver_id_enc', 'constructor_id_enc'
+]
+TARGET = 'is_winner'
+
+DEFAULT_PARAMS = {
+    'n_estimators': 100,
+    'learning_rate': 0.1,
+    'max_depth': 5,
+}
+
+# Search space; n_estimators is an upper bound, early stopping picks the count
+PARAM_GRID = {
+    'max_depth': [2, 3, 4, 5, 6],
+    'learning_rate': [0.03, 0.1, 0.3],
+    'min_child_weight': [1, 5],
+    'subsample': [0.8, 1.0],
+}
+MAX_ESTIMATORS = 500
+EARLY_STOPPING_ROUNDS = 20
+
+def load_features(features_dir, columns=None):
+    """
+    Loads feature dataset.
+    Reads the Parquet feature store when present (only the requested
+    columns), falling back to the CSV.
+    """
+    columns = columns or ['year'] + FEATURES + [TARGET]
+    parquet_path = os.path.join(features_dir, "final_features.parquet")
+    if os.path.exists(parquet_path):
+        return pd.read_parquet(parquet_path, columns=columns)
     path = os.path.join(features_dir, "final_features.csv")
-    return pd.read_csv(path)
+    return pd.read_csv(path, usecols=columns)
 
-def train_model(df):
+def train_model(df, params=None):
     """Trains XGBoost model for race winner prediction."""
     # Time-based split
     # We have 2023 and 2024 data.
@@ -21,12 +58,8 @@ def train_model(df):
     print(f"Train set: {len(train_df)} rows")
     print(f"Test set: {len(test_df)} rows")
     
-    features = [
-        'grid', 'driver_win_rate', 'driver_recent_form',
-        'constructor_win_rate', 'constructor_recent_points',
-        'location_id', 'driver_id_enc', 'constructor_id_enc'
-    ]
-    target = 'is_winner'
+    features = FEATURES
+    target = TARGET
     
     X_train = train_df[features]
     y_train = train_df[target]
@@ -36,11 +69,8 @@ def train_model(df):
     # XGBoost Classifier
     model = xgb.XGBClassifier(
         objective='binary:logistic',
-        n_estimators=100,
-        learning_rate=0.1,
-        max_depth=5,
-        use_label_encoder=False,
-        eval_metric='logloss'
+        eval_metric='logloss',
+        **(params or DEFAULT_PARAMS)
     )
     
     print("Training model...")
@@ -60,16 +90,120 @@ def train_model(df):
     
     return model
 
+# --- HYPERPARAMETER SEARCH ---
+
+def candidate_params(grid=PARAM_GRID, n_iter=None, seed=0):
+    """All grid combinations, or a random sample of n_iter of them."""
+    names = sorted(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    if n_iter is not None and n_iter < len(combos):
+        combos = random.Random(seed).sample(combos, n_iter)
+    return combos
+
+def time_split(df, val_fraction=0.25):
+    """
+    Splits the training years by (year, round): the latest val_fraction of
+    rounds becomes the validation set, so validation is always in the future
+    of the rows it was fitted on.
+    """
+    rounds = df[['year', 'round']].drop_duplicates().sort_values(['year', 'round'])
+    n_val = max(1, int(round(len(rounds) * val_fraction)))
+    cutoff = tuple(rounds.iloc[-n_val])
+    is_val = (df['year'] > cutoff[0]) | ((df['year'] == cutoff[0]) & (df['round'] >= cutoff[1]))
+    return df[~is_val], df[is_val]
+
+# Shared with pool workers through the initializer, not pickled per candidate
+_split = None
+
+def _init_worker(split):
+    global _split
+    _split = split
+
+def evaluate_params(params):
+    """
+    Fits one candidate with early stopping on the validation rounds.
+    Returns its validation log loss, the tree count early stopping kept,
+    the fit time and the median time to score one 20-driver grid.
+    """
+    X_fit, y_fit, X_val, y_val = _split
+    model = xgb.XGBClassifier(
+        objective='binary:logistic',
+        eval_metric='logloss',
+        tree_method='hist',
+        n_estimators=MAX_ESTIMATORS,
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        n_jobs=1,  # parallelism comes from the candidate pool
+        **params
+    )
+    started = time.perf_counter()
+    model.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+    train_s = time.perf_counter() - started
+
+    grid = X_val.iloc[:20]
+    timings = []
+    for _ in range(30):
+        started = time.perf_counter()
+        model.predict_proba(grid)
+        timings.append(time.perf_counter() - started)
+
+    probs = model.predict_proba(X_val)[:, 1]
+    return {
+        **params,
+        'n_estimators': model.best_iteration + 1,
+        'val_log_loss': log_loss(y_val, probs, labels=[0, 1]),
+        'train_s': train_s,
+        'predict_ms': float(np.median(timings)) * 1000,
+    }
+
+def search(df, candidates, workers=None):
+    """
+    Evaluates candidates across a process pool on a time-ordered split of
+    the training years. Returns the leaderboard, best first.
+    """
+    fit_df, val_df = time_split(df[df['year'] < 2024])
+    print(f"Search: {len(candidates)} candidates, fit {len(fit_df)} rows, validate {len(val_df)} rows")
+    split = (fit_df[FEATURES], fit_df[TARGET], val_df[FEATURES], val_df[TARGET])
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             initializer=_init_worker, initargs=(split,)) as pool:
+        rows = list(pool.map(evaluate_params, candidates))
+    return pd.DataFrame(rows).sort_values(['val_log_loss', 'predict_ms']).reset_index(drop=True)
+
 if __name__ == "__main__":
     base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
     features_dir = os.path.join(base_dir, "data", "features")
     models_dir = os.path.join(base_dir, "src", "models")
     os.makedirs(models_dir, exist_ok=True)
     
-    df = load_features(features_dir)
-    model = train_model(df)
+    parser = argparse.ArgumentParser(description="Train the race winner model.")
+    parser.add_argument("--search", choices=["grid", "random"],
+                        help="Pick hyperparameters by search instead of using the defaults.")
+    parser.add_argument("--n-iter", type=int, default=20, help="Candidates sampled by --search random.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.search:
+        df = load_features(features_dir, ['year', 'round'] + FEATURES + [TARGET])
+        n_iter = args.n_iter if args.search == "random" else None
+        leaderboard = search(df, candidate_params(n_iter=n_iter, seed=args.seed), args.workers)
+        leaderboard_path = os.path.join(models_dir, "search_leaderboard.csv")
+        leaderboard.to_csv(leaderboard_path, index=False)
+        print(leaderboard.head(10).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        print(f"Leaderboard saved to {leaderboard_path}")
+        best = leaderboard.to_dict('records')[0]
+        params = {name: best[name] for name in list(PARAM_GRID) + ['n_estimators']}
+        params['tree_method'] = 'hist'
+        print(f"Best parameters: {params}")
+    else:
+        df = load_features(features_dir)
+        params = None
+
+    model = train_model(df, params)
     
     # Save model
     with open(os.path.join(models_dir, "xgb_winner_model.pkl"), "wb") as f:
         pickle.dump(model, f)
+    # Native format: stable across XGBoost versions and readable without
+    # the sklearn wrapper (or xgboost itself, via src/pipeline/tree_eval.py)
+    model.save_model(os.path.join(models_dir, "xgb_winner_model.json"))
     print("Model saved.")
@@ -0,0 +1,84 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """
+    Collects concurrent prediction requests into one model call.
+
+    Requests submitted from the event loop are queued; a collector task takes
+    the first waiting request, keeps gathering more for up to `max_wait_ms`
+    or until `max_rows` driver rows are queued, then scores the whole batch
+    with `score_many` (e.g. F1Predictor.predict_many) on a worker thread and
+    resolves each request's future with its own slice of the results.
+    """
+
+    def __init__(self, score_many, max_wait_ms=2.0, max_rows=512, workers=1):
+        self.score_many = score_many
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_rows = max_rows
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="predict-batch")
+        self._loop = None
+        self._queue = None
+        self._task = None
+        self.batches = 0
+        self.requests = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._collect())
+
+    async def submit(self, race_input):
+        """Queues one race input and waits for its ranked results."""
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait((race_input, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            rows = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while rows < self.max_rows:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                batch.append(item)
+                rows += len(item[0])
+
+            races = [race for race, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.score_many, races)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
@@ -1,31 +1,383 @@
 import pandas as pd
-import xgboost as xgb
 import pickle
 import os
+import glob
+import hashlib
+import tempfile
+import argparse
+import time
+import threading
+import logging
 import numpy as np
 
+from src.pipeline.cache import PredictionCache, canonical_key
+from src.pipeline.metrics import STAGE_SECONDS, BATCH_SIZE, GRID_SIZE, LOAD_SECONDS
+from src.pipeline.tree_eval import TreeEnsemble
+
+logger = logging.getLogger(__name__)
+
+FEATURES = [
+    'grid', 'driver_win_rate', 'driver_recent_form',
+    'constructor_win_rate', 'constructor_recent_points',
+    'location_id', 'driver_id_enc', 'constructor_id_enc'
+]
+
+# Column positions in FEATURES filled from each lookup table
+DRIVER_COLS = [1, 2, 6]        # driver_win_rate, driver_recent_form, driver_id_enc
+CONSTRUCTOR_COLS = [3, 4, 7]   # constructor_win_rate, constructor_recent_points, constructor_id_enc
+LOCATION_COL = 5
+
+# Values used for drivers/constructors/locations never seen in history
+DRIVER_DEFAULTS = [0.0, 20.0, -1.0]
+CONSTRUCTOR_DEFAULTS = [0.0, 0.0, -1.0]
+LOCATION_DEFAULT = -1.0
+
+# Stat columns (positions in FEATURES) the as-of index resolves per point in time
+DRIVER_STAT_COLS = [1, 2]        # driver_win_rate, driver_recent_form
+CONSTRUCTOR_STAT_COLS = [3, 4]   # constructor_win_rate, constructor_recent_points
+
+# (year, round) is packed into one sortable integer: year * ROUND_SLOTS + round
+ROUND_SLOTS = 1000
+
+
+# Columns of the feature history the serving snapshot needs
+SERVING_COLUMNS = [
+    'year', 'round', 'driverId', 'constructorId', 'Location',
+    'driver_win_rate', 'driver_recent_form',
+    'constructor_win_rate', 'constructor_recent_points',
+    'location_id', 'driver_id_enc', 'constructor_id_enc'
+]
+
+
+def load_feature_table(path, columns=None):
+    """
+    Reads a feature file, Parquet, Arrow IPC or CSV by extension, keeping
+    only `columns`. Arrow IPC files are memory-mapped, so their numeric
+    columns stay views on the page cache, shared by every process that maps
+    the same file.
+    """
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns)
+    if path.endswith('.arrow'):
+        import pyarrow as pa
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas(split_blocks=True)
+    return pd.read_csv(path, usecols=columns)
+
+
+def export_feature_table(features_path, arrow_path, columns=SERVING_COLUMNS):
+    """
+    Writes the serving columns of a feature file as an uncompressed Arrow
+    IPC file (atomically), for workers to memory-map with load_feature_table.
+    """
+    import pyarrow as pa
+    table = pa.Table.from_pandas(load_feature_table(features_path, columns), preserve_index=False)
+    # Per-process temp name: several workers may export the same file at once
+    tmp_path = f"{arrow_path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, arrow_path)
+    return arrow_path
+
+
+def _shared_export_prefix(features_path):
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    key = hashlib.sha256(os.path.abspath(features_path).encode()).hexdigest()[:12]
+    return os.path.join(directory, f"f1_features_{key}_")
+
+
+def shared_feature_export(features_path, signature=None):
+    """
+    Path of the shared Arrow export of a feature file (in /dev/shm when
+    available), named after the file's path and signature. Exports it if it
+    doesn't exist yet and removes exports of older versions of the file;
+    processes still mapping a removed export keep their pages until they
+    reload.
+    """
+    signature = signature or file_signature(features_path)
+    prefix = _shared_export_prefix(features_path)
+    arrow_path = prefix + hashlib.sha256(repr(signature).encode()).hexdigest()[:12] + ".arrow"
+    if not os.path.exists(arrow_path):
+        export_feature_table(features_path, arrow_path)
+        for stale in glob.glob(prefix + "*.arrow"):
+            if stale != arrow_path:
+                try:
+                    os.remove(stale)
+                    logger.info(f"Removed stale feature export {stale}")
+                except FileNotFoundError:
+                    pass  # another worker got there first
+    return arrow_path
+
+
+def load_model(model_path, evaluator='xgboost'):
+    """
+    Loads the winner model.
+    .pkl files are unpickled XGBClassifiers. Native XGBoost files (.json,
+    .ubj) are loaded into an XGBClassifier, or with evaluator='numpy' (JSON
+    only) into a TreeEnsemble that scores without importing xgboost.
+    """
+    if model_path.endswith('.pkl'):
+        with open(model_path, "rb") as f:
+            return pickle.load(f)
+    if evaluator == 'numpy':
+        if not model_path.endswith('.json'):
+            raise ValueError("The numpy evaluator needs a JSON model file")
+        return TreeEnsemble.from_json(model_path)
+    import xgboost as xgb
+    model = xgb.XGBClassifier()
+    model.load_model(model_path)
+    return model
+
+
+def file_signature(path):
+    """
+    Cheap change detector for a file: (mtime_ns, size). For a Parquet
+    dataset directory, the newest mtime and total size of its entries.
+    """
+    st = os.stat(path)
+    if os.path.isdir(path):
+        entries = [e.stat() for e in os.scandir(path) if e.is_file()]
+        return (max([st.st_mtime_ns] + [e.st_mtime_ns for e in entries]), sum(e.st_size for e in entries))
+    return (st.st_mtime_ns, st.st_size)
+
+
+def as_of_key(year, round_):
+    """Packs a (year, round) point into the integer key the as-of index sorts by."""
+    return int(year) * ROUND_SLOTS + int(round_)
+
+
+class AsOfIndex:
+    """
+    Point-in-time lookup of per-entity stats.
+
+    Every feature row is keyed by entity * span + as_of_key(year, round),
+    so one sorted int64 array holds each entity's history as a contiguous
+    block in (year, round) order. The latest row at or before a point, for
+    any number of (entity, point) pairs at once, is one np.searchsorted:
+    a binary search inside each entity's block.
+    """
+
+    def __init__(self, codes, years, rounds, values, defaults):
+        keys = years.astype(np.int64) * ROUND_SLOTS + rounds.astype(np.int64)
+        self.span = int(keys.max()) + 1 if len(keys) else 1
+        composite = codes.astype(np.int64) * self.span + keys
+        order = np.argsort(composite, kind='stable')
+        self.keys = composite[order]
+        self.codes = codes.astype(np.int64)[order]
+        values = np.asarray(values, dtype=np.float64)[order]
+        values = np.where(np.isnan(values), defaults, values)
+        # Trailing defaults row for entities with no history before the point
+        self.values = np.vstack([values, np.asarray(defaults, dtype=np.float64)])
+
+    @classmethod
+    def from_history(cls, history_df, column, index, stat_columns, defaults):
+        codes = pd.Index(list(index)).get_indexer(history_df[column])
+        known = codes >= 0
+        return cls(
+            codes[known],
+            history_df['year'].to_numpy()[known],
+            history_df['round'].to_numpy()[known],
+            history_df[stat_columns].to_numpy(dtype=np.float64)[known],
+            defaults,
+        )
+
+    def lookup(self, codes, points):
+        """Stats rows for entity codes as of the packed points (one per code)."""
+        codes = codes.astype(np.int64)
+        targets = codes * self.span + np.minimum(points, self.span - 1)
+        pos = np.searchsorted(self.keys, targets, side='right') - 1
+        safe = np.maximum(pos, 0)
+        found = (pos >= 0) & (self.codes[safe] == codes)
+        return self.values[np.where(found, safe, len(self.values) - 1)]
+
+
+class ServingSnapshot:
+    """
+    Lookup tables derived from the feature history, built once per feature file.
+
+    Each entity (driver, constructor, location) maps to a row index; the stats
+    and encodings live in small float arrays whose last row holds the defaults
+    for unseen entities, so a grid is assembled with a handful of gathers.
+    As-of indexes answer the same lookups at a past (year, round).
+    """
+
+    def __init__(self, history_df, signature=None):
+        self.history_df = history_df
+        self.signature = signature
+
+        # Latest known stats per entity, in race order (year, then round)
+        ordered = history_df.sort_values(['year', 'round'], kind='stable')
+        last_driver_stats = ordered.groupby('driverId', observed=True).last()
+        last_constructor_stats = ordered.groupby('constructorId', observed=True).last()
+
+        # Same encodings as training (last occurrence wins, as dict(zip()) did)
+        driver_map = dict(zip(history_df['driverId'], history_df['driver_id_enc']))
+        const_map = dict(zip(history_df['constructorId'], history_df['constructor_id_enc']))
+        loc_map = dict(zip(history_df['Location'], history_df['location_id']))
+
+        self.driver_index = {d: i for i, d in enumerate(last_driver_stats.index)}
+        self.driver_table = self._build_table(
+            [
+                last_driver_stats['driver_win_rate'],
+                last_driver_stats['driver_recent_form'],
+                last_driver_stats.index.map(driver_map),
+            ],
+            DRIVER_DEFAULTS,
+        )
+
+        self.constructor_index = {c: i for i, c in enumerate(last_constructor_stats.index)}
+        self.constructor_table = self._build_table(
+            [
+                last_constructor_stats['constructor_win_rate'],
+                last_constructor_stats['constructor_recent_points'],
+                last_constructor_stats.index.map(const_map),
+            ],
+            CONSTRUCTOR_DEFAULTS,
+        )
+
+        self.driver_as_of = AsOfIndex.from_history(
+            history_df, 'driverId', self.driver_index,
+            ['driver_win_rate', 'driver_recent_form'], DRIVER_DEFAULTS[:2])
+        self.constructor_as_of = AsOfIndex.from_history(
+            history_df, 'constructorId', self.constructor_index,
+            ['constructor_win_rate', 'constructor_recent_points'], CONSTRUCTOR_DEFAULTS[:2])
+
+        self.location_index = {loc: i for i, loc in enumerate(loc_map)}
+        self.location_table = self._build_table([list(loc_map.values())], [LOCATION_DEFAULT])[:, 0]
+
+        # First and last season covered, for validating as-of points
+        years = history_df['year']
+        self.seasons = (int(years.min()), int(years.max())) if len(years) else (0, -1)
+
+        # Sorted name lists for the metadata endpoints
+        self.drivers = sorted(history_df['driverId'].unique().tolist())
+        self.constructors = sorted(history_df['constructorId'].unique().tolist())
+        self.locations = sorted(history_df['Location'].unique().tolist())
+
+    @staticmethod
+    def _build_table(columns, defaults):
+        """Stacks columns into a float array with a trailing defaults row."""
+        table = np.column_stack([np.asarray(c, dtype=np.float64) for c in columns])
+        # Missing stats fall back to the defaults, as .fillna() did
+        table = np.where(np.isnan(table), defaults, table)
+        return np.vstack([table, np.asarray(defaults, dtype=np.float64)])
+
+    def build_matrix(self, race_input, points=None):
+        """
+        Returns the (n_drivers, len(FEATURES)) feature matrix for a grid.
+
+        points: optional packed as-of keys, one per row (-1 for the latest
+        stats). A row's stats then come from the entity's last feature row
+        at or before that (year, round); feature rows hold the stats going
+        into their race, so this is what was known before the race started.
+        """
+        n = len(race_input)
+        n_drivers = len(self.driver_index)
+        n_constructors = len(self.constructor_index)
+        n_locations = len(self.location_index)
+
+        d_idx = np.fromiter((self.driver_index.get(r['driverId'], n_drivers) for r in race_input), np.intp, n)
+        c_idx = np.fromiter((self.constructor_index.get(r['constructorId'], n_constructors) for r in race_input), np.intp, n)
+        l_idx = np.fromiter((self.location_index.get(r['Location'], n_locations) for r in race_input), np.intp, n)
+
+        X = np.empty((n, len(FEATURES)), dtype=np.float64)
+        X[:, 0] = np.fromiter((r['grid'] for r in race_input), np.float64, n)
+        X[:, DRIVER_COLS] = self.driver_table[d_idx]
+        X[:, CONSTRUCTOR_COLS] = self.constructor_table[c_idx]
+        X[:, LOCATION_COL] = self.location_table[l_idx]
+        if points is not None:
+            past = np.flatnonzero(points >= 0)
+            if len(past):
+                X[np.ix_(past, DRIVER_STAT_COLS)] = self.driver_as_of.lookup(d_idx[past], points[past])
+                X[np.ix_(past, CONSTRUCTOR_STAT_COLS)] = self.constructor_as_of.lookup(c_idx[past], points[past])
+        return X
+
+
 class F1Predictor:
-    def __init__(self, model_path, features_path):
+    def __init__(self, model_path, features_path, cache_size=1024, cache_ttl=300.0, evaluator='xgboost',
+                 share_features=False):
         self.model_path = model_path
         self.features_path = features_path
+        # Load through a memory-mapped Arrow export shared with other processes
+        # (see shared_feature_export); features_path is still what's watched
+        self.share_features = share_features
+        self.evaluator = evaluator
         self.model = None
-        self.history_df = None
+        self.snapshot = None
+        self._reload_lock = threading.Lock()
+        # Bumped on every model/snapshot reload so stale results never match
+        self._generation = 0
+        self.cache = PredictionCache(cache_size, cache_ttl) if cache_size else None
         self.load_resources()
 
+    @property
+    def history_df(self):
+        return self.snapshot.history_df
+
     def load_resources(self):
         """Loads model and historical data."""
+        logger.info(f"Loading model from {self.model_path}")
         if os.path.exists(self.model_path):
-            with open(self.model_path, "rb") as f:
-                self.model = pickle.load(f)
+            started = time.perf_counter()
+            self.model = load_model(self.model_path, self.evaluator)
+            LOAD_SECONDS.set(time.perf_counter() - started, 'model')
         else:
+            logger.error(f"Model not found at {self.model_path}")
             raise FileNotFoundError(f"Model not found at {self.model_path}")
-            
-        if os.path.exists(self.features_path):
-            self.history_df = pd.read_csv(self.features_path)
-        else:
+
+        self.snapshot = self._build_snapshot()
+        self._invalidate_cache()
+
+    def _invalidate_cache(self):
+        self._generation += 1
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _build_snapshot(self):
+        logger.info(f"Loading features from {self.features_path}")
+        if not os.path.exists(self.features_path):
+            logger.error(f"Features not found at {self.features_path}")
             raise FileNotFoundError(f"Features not found at {self.features_path}")
+        started = time.perf_counter()
+        signature = file_signature(self.features_path)
+        path = self.features_path
+        if self.share_features:
+            path = shared_feature_export(self.features_path, signature)
+        history_df = load_feature_table(path, SERVING_COLUMNS)
+        snapshot = ServingSnapshot(history_df, signature)
+        LOAD_SECONDS.set(time.perf_counter() - started, 'features')
+        return snapshot
 
-    def preprocess_input(self, race_input):
+    def refresh_if_stale(self):
+        """
+        Rebuilds the serving snapshot if the feature file changed on disk.
+
+        The new snapshot is built off to the side and swapped in with a single
+        assignment, so concurrent predictions keep using the old one until the
+        swap. Returns True if a rebuild happened.
+        """
+        try:
+            current = file_signature(self.features_path)
+        except OSError:
+            return False
+        if current == self.snapshot.signature:
+            return False
+        # Another thread is already rebuilding; keep serving the old snapshot
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            if file_signature(self.features_path) == self.snapshot.signature:
+                return False
+            self.snapshot = self._build_snapshot()
+            self._invalidate_cache()
+            logger.info("Serving snapshot rebuilt after feature file change.")
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def preprocess_input(self, race_input, snapshot=None, points=None):
         """
         Preprocesses input data for a new race.
         race_input: List of dicts (one per driver) with keys:
@@ -34,98 +386,281 @@ class F1Predictor:
             - grid
             - Location
         """
-        # Convert input to DataFrame
-        input_df = pd.DataFrame(race_input)
-        
-        # We need to calculate derived features:
-        # driver_win_rate, driver_recent_form, constructor_win_rate, constructor_recent_points
-        # We will look up these values from the latest history for each driver/constructor.
-        
-        # Get latest stats from history
-        # This is a simplification. Ideally we re-calculate rolling windows including the new race?
-        # No, we use stats UP TO this race.
-        
-        # Create lookup dicts
-        # We take the last known value for each driver/constructor
-        # Sort history by year/round
-        # Assuming history_df is sorted or we sort it
-        # Actually, we can just take the mean of the last 3 races from history for "recent form"
-        # and cumulative stats from the last record.
-        
-        # For simplicity, we will just take the last record for each driver in history
-        last_driver_stats = self.history_df.sort_values('year').groupby('driverId').last()
-        last_constructor_stats = self.history_df.sort_values('year').groupby('constructorId').last()
-        
-        # Map stats to input
-        input_df['driver_win_rate'] = input_df['driverId'].map(last_driver_stats['driver_win_rate']).fillna(0)
-        input_df['driver_recent_form'] = input_df['driverId'].map(last_driver_stats['driver_recent_form']).fillna(20)
-        
-        input_df['constructor_win_rate'] = input_df['constructorId'].map(last_constructor_stats['constructor_win_rate']).fillna(0)
-        input_df['constructor_recent_points'] = input_df['constructorId'].map(last_constructor_stats['constructor_recent_points']).fillna(0)
-        
-        # Encode Categoricals
-        # We need to use the same encoding as training.
-        # Since we used .cat.codes, we need to map the categories.
-        # Ideally we should have saved the encoders.
-        # For now, we will try to map based on the history_df codes.
-        
-        # Create mappings
-        loc_map = dict(zip(self.history_df['Location'], self.history_df['location_id']))
-        driver_map = dict(zip(self.history_df['driverId'], self.history_df['driver_id_enc']))
-        const_map = dict(zip(self.history_df['constructorId'], self.history_df['constructor_id_enc']))
-        
-        input_df['location_id'] = input_df['Location'].map(loc_map).fillna(-1)
-        input_df['driver_id_enc'] = input_df['driverId'].map(driver_map).fillna(-1)
-        input_df['constructor_id_enc'] = input_df['constructorId'].map(const_map).fillna(-1)
-        
-        # Select features
-        features = [
-            'grid', 'driver_win_rate', 'driver_recent_form',
-            'constructor_win_rate', 'constructor_recent_points',
-            'location_id', 'driver_id_enc', 'constructor_id_enc'
-        ]
-        
-        return input_df[features]
-
-    def predict(self, race_input):
-        """Generates predictions."""
-        X = self.preprocess_input(race_input)
-        
-        # Predict
-        probs = self.model.predict_proba(X)[:, 1]
-        
-        # Format output
+        # Stats and encodings are looked up in the snapshot built at load time:
+        # the last known record for each driver/constructor, and the same
+        # category codes used in training (-1 for unseen values). Rows with
+        # an as-of point use the stats known at that point.
+        snapshot = snapshot or self.snapshot
+        with STAGE_SECONDS.time('lookup'):
+            X = snapshot.build_matrix(race_input, points)
+        with STAGE_SECONDS.time('dataframe'):
+            return pd.DataFrame(X, columns=FEATURES)
+
+    @staticmethod
+    def _as_of_per_race(as_of, n_races):
+        """
+        Normalizes an as-of argument to one (year, round) tuple or None per
+        race. Accepts None (latest stats everywhere), a single (year, round)
+        tuple for every race, or a list with one (year, round) tuple or None
+        per race; anything else raises ValueError, as does any point outside
+        year >= 0 and 0 <= round < ROUND_SLOTS (it would pack into another
+        season's keys, or a negative key, which reads as "latest").
+        """
+        if as_of is None:
+            return [None] * n_races
+        if isinstance(as_of, tuple):
+            points = [as_of] * n_races
+        elif isinstance(as_of, list):
+            if len(as_of) != n_races:
+                raise ValueError(f"Expected {n_races} as-of points, got {len(as_of)}")
+            points = as_of
+        else:
+            raise ValueError(f"as_of must be a (year, round) tuple or a list of them, got {as_of!r}")
+        for point in points:
+            if point is None:
+                continue
+            if not (isinstance(point, tuple) and len(point) == 2
+                    and all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in point)):
+                raise ValueError(f"As-of points must be (year, round) integer tuples, got {point!r}")
+            if point[0] < 0 or not 0 <= point[1] < ROUND_SLOTS:
+                raise ValueError(f"As-of point {point} needs year >= 0 and 0 <= round < {ROUND_SLOTS}")
+        return [None if point is None else (int(point[0]), int(point[1])) for point in points]
+
+    def check_as_of(self, point):
+        """
+        Raises ValueError unless (year, round) is a valid point in a season
+        covered by the feature history. Points after the history need no
+        as-of lookup: they would just get the latest stats.
+        """
+        (point,) = self._as_of_per_race(point, 1)
+        first, last = self.snapshot.seasons
+        if not first <= point[0] <= last:
+            raise ValueError(f"As-of year {point[0]} is outside the feature history ({first}-{last})")
+
+    @staticmethod
+    def _as_of_points(per_race, lengths):
+        """Packed as-of keys per driver row (-1 for latest), or None if no race has a point."""
+        if all(point is None for point in per_race):
+            return None
+        keys = [-1 if point is None else as_of_key(*point) for point in per_race]
+        return np.repeat(np.asarray(keys, dtype=np.int64), lengths)
+
+    def score(self, race_input, as_of=None):
+        """
+        Returns the model's win probability for each driver, in input order.
+        With as_of=(year, round), uses the stats known before that round.
+        """
+        points = self._as_of_points(self._as_of_per_race(as_of, 1), [len(race_input)])
+        X = self.preprocess_input(race_input, points=points)
+        GRID_SIZE.observe(len(race_input), 'single')
+        with STAGE_SECONDS.time('predict_proba'):
+            return self.model.predict_proba(X)[:, 1]
+
+    def predict(self, race_input, as_of=None):
+        """
+        Generates predictions, served from the cache for repeated grids.
+        as_of: optional (year, round) tuple to score with the stats known
+        before that round instead of the latest ones.
+        """
+        (as_of,) = self._as_of_per_race(as_of, 1)
+        if self.cache is None:
+            return self._predict(race_input, as_of)
+        key = (self._generation, as_of, canonical_key(race_input))
+        results = self.cache.get_or_compute(key, lambda: self._predict(race_input, as_of))
+        return [dict(r) for r in results]
+
+    def _predict(self, race_input, as_of=None):
+        probs = self.score(race_input, as_of)
+        return self._rank(race_input, probs)
+
+    def predict_many(self, races, as_of=None, use_cache=True):
+        """
+        Generates predictions for several races with a single model call.
+
+        races: List of race inputs, each in the format accepted by predict().
+        Returns one ranked result list per race, in input order. Races found
+        in the prediction cache are not rescored.
+        as_of: optional point in time: one (year, round) tuple for every
+        race, or a list with one (year, round) tuple or None per race, so
+        a past season can be scored round by round in the same call.
+        use_cache: False scores every race without reading or filling the
+        prediction cache.
+        """
+        # Generation first, as predict() does: reloads swap the snapshot before
+        # bumping the generation, so results from a newer snapshot may land
+        # under an old (never again looked up) key, but never the reverse
+        generation = self._generation
+        snapshot = self.snapshot
+        cache = self.cache if use_cache else None
+        points = self._as_of_per_race(as_of, len(races))
+        results = [None] * len(races)
+        pending = list(range(len(races)))
+        if cache is not None:
+            keys = [(generation, points[i], canonical_key(race)) for i, race in enumerate(races)]
+            for i in pending:
+                cached = cache.get(keys[i])
+                if cached is not None:
+                    results[i] = [dict(r) for r in cached]
+            pending = [i for i in pending if results[i] is None]
+
+        rows = [row for i in pending for row in races[i]]
+        if rows:
+            row_points = self._as_of_points([points[i] for i in pending], [len(races[i]) for i in pending])
+            X = self.preprocess_input(rows, snapshot, row_points)
+            BATCH_SIZE.observe(len(pending), 'batch')
+            GRID_SIZE.observe(len(rows), 'batch')
+            with STAGE_SECONDS.time('predict_proba'):
+                probs = self.model.predict_proba(X)[:, 1]
+
+            # Split the flat probability vector back into one slice per race
+            offsets = np.cumsum([len(races[i]) for i in pending])[:-1]
+            for i, p in zip(pending, np.split(probs, offsets)):
+                results[i] = self._rank(races[i], p)
+                if cache is not None and races[i]:
+                    cache.put(keys[i], results[i])
+                    results[i] = [dict(r) for r in results[i]]
+        for i in pending:
+            if results[i] is None:
+                results[i] = []
+        return results
+
+    SWEEP_DIMENSIONS = ('grid', 'Location', 'constructorId')
+
+    def sweep(self, race_input, dimension, driver_id=None, values=None):
+        """
+        Scores what-if variants of one grid in a single model call.
+
+        dimension:
+            - 'grid': driver_id starts from each slot in values (default
+              1..len(race_input)); whoever held that slot takes the driver's
+              original one.
+            - 'Location': the whole grid races at each location in values
+              (default: every known location).
+            - 'constructorId': driver_id drives for each constructor in
+              values (default: every known constructor).
+        Returns {'dimension', 'values', 'drivers', 'probabilities'}, where
+        probabilities[i][j] is the win probability of drivers[j] in the
+        scenario for values[i].
+        """
+        if dimension not in self.SWEEP_DIMENSIONS:
+            raise ValueError(f"Unknown sweep dimension {dimension!r}, expected one of {self.SWEEP_DIMENSIONS}")
+        drivers = [r['driverId'] for r in race_input]
+        if dimension != 'Location' and driver_id not in drivers:
+            raise ValueError(f"Driver {driver_id!r} is not on the grid")
+
+        if values is None:
+            if dimension == 'grid':
+                values = list(range(1, len(race_input) + 1))
+            elif dimension == 'Location':
+                values = self.get_locations()
+            else:
+                values = self.get_constructors()
+
+        values = self._sweep_values(dimension, values)
+
+        target = drivers.index(driver_id) if driver_id in drivers else None
+        rows = []
+        for value in values:
+            scenario = [dict(r) for r in race_input]
+            if dimension == 'grid':
+                original = scenario[target]['grid']
+                for r in scenario:
+                    if r['grid'] == value:
+                        r['grid'] = original
+                scenario[target]['grid'] = value
+            elif dimension == 'Location':
+                for r in scenario:
+                    r['Location'] = value
+            else:
+                scenario[target]['constructorId'] = value
+            rows.extend(scenario)
+
+        probs = np.empty(0)
+        if rows:
+            X = self.preprocess_input(rows)
+            BATCH_SIZE.observe(len(values), 'sweep')
+            GRID_SIZE.observe(len(rows), 'sweep')
+            with STAGE_SECONDS.time('predict_proba'):
+                probs = self.model.predict_proba(X)[:, 1]
+        return {
+            'dimension': dimension,
+            'values': list(values),
+            'drivers': drivers,
+            'probabilities': probs.reshape(len(values), len(race_input)).tolist(),
+        }
+
+    @staticmethod
+    def _sweep_values(dimension, values):
+        """
+        Checks sweep values against the dimension: grid slots must be
+        integers (numeric strings are converted), locations and constructors
+        strings. Raises ValueError otherwise, rather than scoring a grid that
+        can't happen (a "1" never matches slot 1, so nobody would be swapped).
+        """
+        checked = []
+        for value in values:
+            if dimension == 'grid':
+                if isinstance(value, str) and value.strip().lstrip('-').isdigit():
+                    value = int(value)
+                if isinstance(value, bool) or not isinstance(value, (int, np.integer)):
+                    raise ValueError(f"Grid sweep values must be integers, got {value!r}")
+                checked.append(int(value))
+            else:
+                if not isinstance(value, str):
+                    raise ValueError(f"{dimension} sweep values must be strings, got {value!r}")
+                checked.append(value)
+        return checked
+
+    @staticmethod
+    def _rank(race_input, probs):
+        """Pairs drivers with their probabilities, most likely winner first."""
         results = []
         for i, prob in enumerate(probs):
             results.append({
                 'driverId': race_input[i]['driverId'],
                 'win_probability': float(prob)
             })
-            
+
         # Sort by probability
         results.sort(key=lambda x: x['win_probability'], reverse=True)
         return results
 
     def get_drivers(self):
         """Returns list of unique drivers."""
-        return sorted(self.history_df['driverId'].unique().tolist())
+        return list(self.snapshot.drivers)
 
     def get_constructors(self):
         """Returns list of unique constructors."""
-        return sorted(self.history_df['constructorId'].unique().tolist())
+        return list(self.snapshot.constructors)
 
     def get_locations(self):
         """Returns list of unique locations."""
-        return sorted(self.history_df['Location'].unique().tolist())
+        return list(self.snapshot.locations)
+
+    def get_metadata(self):
+        """Returns drivers, constructors and locations from one snapshot."""
+        snapshot = self.snapshot
+        return {
+            'drivers': list(snapshot.drivers),
+            'constructors': list(snapshot.constructors),
+            'locations': list(snapshot.locations),
+        }
 
 if __name__ == "__main__":
-    # Test run
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    # Test run (from the repository root: python -m src.pipeline.predict)
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     model_path = os.path.join(base_dir, "src", "models", "xgb_winner_model.pkl")
-    features_path = os.path.join(base_dir, "data", "features", "final_features.csv")
-    
+    features_path = os.path.join(base_dir, "data", "features", "final_features.parquet")
+    if not os.path.exists(features_path):
+        features_path = os.path.join(base_dir, "data", "features", "final_features.csv")
+
+    parser = argparse.ArgumentParser(description="Run a sample prediction.")
+    parser.add_argument("--profile", nargs="?", const=os.path.join(base_dir, "data", "profiles"),
+                        metavar="DIR", help="Profile the prediction and write collapsed stacks to DIR.")
+    args = parser.parse_args()
+
     predictor = F1Predictor(model_path, features_path)
-    
+
     # Mock input for a 2026 race
     mock_input = [
         {'driverId': 'max_verstappen', 'constructorId': 'red_bull', 'grid': 1, 'Location': 'Monza'},
@@ -133,8 +668,16 @@ if __name__ == "__main__":
         {'driverId': 'hamilton', 'constructorId': 'ferrari', 'grid': 3, 'Location': 'Monza'}, # Hamilton at Ferrari in 2025/26!
         {'driverId': 'norris', 'constructorId': 'mclaren', 'grid': 4, 'Location': 'Monza'},
     ]
-    
-    predictions = predictor.predict(mock_input)
+
+    if args.profile:
+        from src.pipeline.profiling import profile_call
+        predictor.score(mock_input)  # warm-up, so one-time imports stay out of the profile
+        predictions, profiler = profile_call(predictor._predict, mock_input)
+        print(f"Profile written to {profiler.save(args.profile, 'predict')}")
+        for frame, us in profiler.top(10):
+            print(f"{us:>10.0f} us  {frame}")
+    else:
+        predictions = predictor.predict(mock_input)
     print("Predicted Winner Probabilities:")
     for p in predictions:
         print(f"{p['driverId']}: {p['win_probability']:.4f}")
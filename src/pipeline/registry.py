@@ -0,0 +1,302 @@
+"""
+Versioned model and feature-snapshot registry, and the serving-side manager
+that loads versions in the background and swaps them in.
+
+On disk, each version is a directory holding the model, the feature
+snapshot it was trained against and a manifest; state.json names the
+active version and an optional shadow version:
+
+    <root>/v1/{manifest.json, xgb_winner_model.json, final_features.parquet}
+    <root>/state.json            {"active": "v1", "shadow": null}
+
+    python -m src.pipeline.registry publish [--model PATH] [--features PATH] [--activate]
+    python -m src.pipeline.registry activate v2
+    python -m src.pipeline.registry shadow v3   (or: shadow none)
+    python -m src.pipeline.registry list
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.pipeline.metrics import MODEL_SWAPS, SHADOW_COMPARISONS, SHADOW_ABS_DIFF
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_ROOT = os.path.join(BASE_DIR, "src", "models", "registry")
+STATE_FILE = "state.json"
+MANIFEST_FILE = "manifest.json"
+# Version names are single path components (v1, v2, ... or --version names)
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+def _write_json_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+
+    def versions(self):
+        """Published versions, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        found = [
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, MANIFEST_FILE))
+        ]
+        return sorted(found, key=lambda v: (len(v), v))
+
+    def manifest(self, version):
+        # Versions can come from a request header: only names of published
+        # versions are ever joined into a path
+        if not isinstance(version, str) or not VERSION_PATTERN.match(version) or version not in self.versions():
+            raise KeyError(f"Unknown model version {version!r}")
+        path = os.path.join(self.root, version, MANIFEST_FILE)
+        with open(path) as f:
+            return json.load(f)
+
+    def paths(self, version):
+        """(model_path, features_path) for a version."""
+        manifest = self.manifest(version)
+        directory = os.path.join(self.root, version)
+        return os.path.join(directory, manifest['model']), os.path.join(directory, manifest['features'])
+
+    def state(self):
+        path = os.path.join(self.root, STATE_FILE)
+        if not os.path.exists(path):
+            return {'active': None, 'shadow': None}
+        with open(path) as f:
+            return {'active': None, 'shadow': None, **json.load(f)}
+
+    def _set_state(self, **changes):
+        state = self.state()
+        for version in changes.values():
+            if version is not None:
+                self.manifest(version)  # raises for unknown versions
+        state.update(changes)
+        _write_json_atomic(os.path.join(self.root, STATE_FILE), state)
+        return state
+
+    def activate(self, version):
+        return self._set_state(active=version)
+
+    def set_shadow(self, version):
+        return self._set_state(shadow=version)
+
+    def publish(self, model_path, features_path, version=None, activate=False, notes=None):
+        """
+        Copies a model and feature snapshot into a new version directory.
+
+        Files are staged in a temporary directory and renamed into place, so
+        a server polling the registry never sees a half-written version.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        if version is None:
+            numbers = [int(v[1:]) for v in self.versions() if v[:1] == 'v' and v[1:].isdigit()]
+            version = f"v{max(numbers, default=0) + 1}"
+        if not VERSION_PATTERN.match(version):
+            raise ValueError(f"Invalid version name {version!r}")
+        if os.path.exists(os.path.join(self.root, version)):
+            raise ValueError(f"Version {version!r} already exists")
+
+        staging = tempfile.mkdtemp(prefix=".publish-", dir=self.root)
+        try:
+            for path in (model_path, features_path):
+                target = os.path.join(staging, os.path.basename(path))
+                if os.path.isdir(path):
+                    shutil.copytree(path, target)  # Parquet dataset directory
+                else:
+                    shutil.copy2(path, target)
+            _write_json_atomic(os.path.join(staging, MANIFEST_FILE), {
+                'version': version,
+                'model': os.path.basename(model_path),
+                'features': os.path.basename(features_path),
+                'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                'notes': notes,
+            })
+            os.rename(staging, os.path.join(self.root, version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        if activate:
+            self.activate(version)
+        return version
+
+
+class ModelManager:
+    """
+    Keeps warmed-up predictors for registry versions and tracks which one
+    is active.
+
+    Loading happens on a background thread; the active version only changes
+    once its predictor is fully built and warmed up, by a single attribute
+    assignment, so requests in flight finish on whichever predictor they
+    started with. Versions requested by pinned requests are loaded on the
+    same thread and the request is told to retry. Shadow scoring runs on its
+    own thread with a bounded backlog and never delays a response.
+    """
+
+    def __init__(self, registry, build, keep=3, max_shadow_backlog=64):
+        self.registry = registry
+        self.build = build  # (model_path, features_path) -> warmed-up predictor
+        self.keep = keep
+        self.loaded = {}
+        self.active = None
+        self.shadow = None
+        self._loading = set()
+        self._lock = threading.Lock()
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+        self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._shadow_backlog = 0
+        self.max_shadow_backlog = max_shadow_backlog
+
+    def _load(self, version):
+        try:
+            started = time.perf_counter()
+            predictor = self.build(*self.registry.paths(version))
+            predictor.version = version
+            with self._lock:
+                self.loaded[version] = predictor
+            logger.info(f"Loaded model version {version} in {time.perf_counter() - started:.2f}s")
+            return predictor
+        finally:
+            with self._lock:
+                self._loading.discard(version)
+
+    def load_async(self, version):
+        """Starts loading version in the background unless it is loaded or loading."""
+        with self._lock:
+            if version in self.loaded or version in self._loading:
+                return
+            self._loading.add(version)
+        future = self._loader.submit(self._load, version)
+        future.add_done_callback(lambda f: f.exception() and logger.error(
+            f"Failed to load model version {version}: {f.exception()}"))
+
+    def sync(self):
+        """
+        Brings the loaded set in line with the registry state: loads the
+        active and shadow versions if needed (blocking the calling thread,
+        not the request path), then switches to them. Returns True if the
+        active version changed.
+        """
+        state = self.registry.state()
+        if state['active'] is not None and state['active'] not in self.loaded:
+            self._load(state['active'])
+        if state['shadow'] is not None and state['shadow'] not in self.loaded:
+            try:
+                self._load(state['shadow'])
+            except Exception as e:
+                # A broken shadow version must not hold up the active one
+                logger.error(f"Failed to load shadow version {state['shadow']}: {e}")
+
+        changed = state['active'] != self.active
+        if changed:
+            logger.info(f"Active model version {self.active} -> {state['active']}")
+            self.active = state['active']
+            MODEL_SWAPS.inc()
+        self.shadow = state['shadow'] if state['shadow'] in self.loaded and state['shadow'] != state['active'] else None
+        self._evict()
+        return changed
+
+    def _evict(self):
+        with self._lock:
+            spare = [v for v in self.loaded if v not in (self.active, self.shadow)]
+            for version in spare[:max(0, len(self.loaded) - self.keep)]:
+                del self.loaded[version]
+
+    def current(self):
+        return self.loaded.get(self.active)
+
+    def get(self, version):
+        """
+        The predictor for a pinned version. Raises KeyError for versions not
+        in the registry and LookupError (after scheduling a load) for ones
+        that are not loaded yet.
+        """
+        predictor = self.loaded.get(version)
+        if predictor is not None:
+            return predictor
+        self.registry.manifest(version)
+        self.load_async(version)
+        raise LookupError(f"Model version {version!r} is loading, retry shortly")
+
+    def shadow_score(self, race_inputs, results):
+        """Queues a comparison of the shadow version against results; never blocks."""
+        shadow = self.loaded.get(self.shadow) if self.shadow else None
+        if shadow is None:
+            return
+        with self._lock:
+            if self._shadow_backlog >= self.max_shadow_backlog:
+                SHADOW_COMPARISONS.inc('dropped')
+                return
+            self._shadow_backlog += 1
+        self._shadow_pool.submit(self._compare, shadow, race_inputs, results)
+
+    def _compare(self, shadow, race_inputs, results):
+        try:
+            for primary, candidate in zip(results, shadow.predict_many(race_inputs)):
+                if not primary:
+                    continue
+                probs = {r['driverId']: r['win_probability'] for r in candidate}
+                diff = sum(abs(r['win_probability'] - probs[r['driverId']]) for r in primary) / len(primary)
+                SHADOW_ABS_DIFF.observe(diff)
+                same = primary[0]['driverId'] == candidate[0]['driverId']
+                SHADOW_COMPARISONS.inc('agree' if same else 'disagree')
+        except Exception as e:
+            SHADOW_COMPARISONS.inc('error')
+            logger.error(f"Shadow scoring failed: {e}")
+        finally:
+            with self._lock:
+                self._shadow_backlog -= 1
+
+    def close(self):
+        self._loader.shutdown(wait=False)
+        self._shadow_pool.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the model registry.")
+    parser.add_argument("--root", default=os.getenv("MODEL_REGISTRY_DIR", DEFAULT_ROOT))
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="Copy a model and feature snapshot in as a new version.")
+    publish.add_argument("--model", default=os.path.join(BASE_DIR, "src", "models", "xgb_winner_model.json"))
+    publish.add_argument("--features", default=os.path.join(BASE_DIR, "data", "features", "final_features.parquet"))
+    publish.add_argument("--version")
+    publish.add_argument("--notes")
+    publish.add_argument("--activate", action="store_true")
+    activate = commands.add_parser("activate", help="Make a version the active one.")
+    activate.add_argument("version")
+    shadow = commands.add_parser("shadow", help="Shadow-score a version ('none' to stop).")
+    shadow.add_argument("version")
+    commands.add_parser("list", help="List versions.")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == "publish":
+        version = registry.publish(args.model, args.features, args.version, args.activate, args.notes)
+        print(f"Published {version}" + (" (active)" if args.activate else ""))
+    elif args.command == "activate":
+        print(registry.activate(args.version))
+    elif args.command == "shadow":
+        print(registry.set_shadow(None if args.version == "none" else args.version))
+    else:
+        state = registry.state()
+        for version in registry.versions():
+            manifest = registry.manifest(version)
+            marks = [m for m, v in (('active', state['active']), ('shadow', state['shadow'])) if v == version]
+            columns = [f"{version:<8}", manifest['created'], manifest['model'], manifest['features'],
+                       ' '.join(marks), manifest.get('notes') or '']
+            print("  ".join(c for c in columns if c))
@@ -0,0 +1,196 @@
+"""
+Runs the data pipeline (fetch -> process -> features -> train), skipping
+stages whose outputs are still valid.
+
+Each stage records a fingerprint of its script, parameters and input file
+contents, plus the hashes of the outputs it produced, in
+data/pipeline_state.json. A stage is skipped when its fingerprint is
+unchanged and its outputs are still on disk with the recorded contents.
+Stages marked 'always' (fetch, whose real input is the upstream data)
+run every time; downstream stages still skip if their outputs match.
+Stages run as soon as their dependencies finish, on a worker pool, so
+independent stages run in parallel.
+
+    python -m src.pipeline.run_pipeline [--fetch] [--force STAGE ...]
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STATE_PATH = os.path.join(BASE_DIR, "data", "pipeline_state.json")
+
+
+def build_stages(args):
+    """Stage definitions; paths are relative to the repository root."""
+    fetch_params = ["--start", str(args.start), "--end", str(args.end),
+                    "--source", args.source, "--workers", str(args.workers)]
+    return {
+        'fetch': {
+            'script': "src/data/fetch_fastf1.py",
+            'params': fetch_params,
+            'deps': [],
+            'inputs': [],
+            # Nothing local changes when new races are published upstream, so
+            # always run it; it resumes from its per-race checkpoints and only
+            # downloads what's missing
+            'always': True,
+            'outputs': ["data/raw/races.csv", "data/raw/results.csv"],
+        },
+        'process': {
+            'script': "src/data/process_data.py",
+            'params': [],
+            'deps': ['fetch'] if args.fetch else [],
+            'inputs': ["data/raw/races.csv", "data/raw/results.csv"],
+            'outputs': ["data/processed/race_data.csv"],
+        },
+        'features': {
+            'script': "src/features/build_features.py",
+            'params': ["--windows", *map(str, args.windows)],
+            'deps': ['process'],
+            'inputs': ["data/processed/race_data.csv"],
+            'outputs': [
+                "data/features/final_features.csv",
+                "data/features/final_features.parquet",
+                "data/features/feature_state.json",
+            ],
+        },
+        'train': {
+            'script': "src/models/train_model.py",
+            'params': [],
+            'deps': ['features'],
+            'inputs': ["data/features/final_features.parquet"],
+            'outputs': ["src/models/xgb_winner_model.pkl", "src/models/xgb_winner_model.json"],
+        },
+    }
+
+
+def file_hash(path):
+    """Content hash of a file, or of a directory's visible files (e.g. a Parquet dataset)."""
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if not name.startswith('.'):
+                digest.update(name.encode())
+                digest.update(file_hash(os.path.join(path, name)).encode())
+        return digest.hexdigest()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(name, stage):
+    """Hash of the stage's script, parameters and input contents."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([name, stage['params']]).encode())
+    for path in [stage['script']] + stage['inputs']:
+        full = os.path.join(BASE_DIR, path)
+        digest.update(path.encode())
+        digest.update(file_hash(full).encode() if os.path.exists(full) else b"missing")
+    return digest.hexdigest()
+
+
+def outputs_valid(record, stage):
+    recorded = record.get('outputs', {})
+    for path in stage['outputs']:
+        full = os.path.join(BASE_DIR, path)
+        if path not in recorded or not os.path.exists(full) or file_hash(full) != recorded[path]:
+            return False
+    return True
+
+
+def run_stage(name, stage, record, force):
+    """Runs one stage unless it is up to date. Returns (status, seconds, new record)."""
+    started = time.perf_counter()
+    fp = fingerprint(name, stage)
+    if not force and not stage.get('always') and record.get('fingerprint') == fp and outputs_valid(record, stage):
+        return 'skipped', time.perf_counter() - started, record
+
+    print(f"[{name}] running {stage['script']} {' '.join(stage['params'])}".rstrip())
+    result = subprocess.run([sys.executable, stage['script'], *stage['params']], cwd=BASE_DIR)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        return 'failed', elapsed, {}
+    outputs = {
+        path: file_hash(os.path.join(BASE_DIR, path))
+        for path in stage['outputs'] if os.path.exists(os.path.join(BASE_DIR, path))
+    }
+    return 'ran', elapsed, {'fingerprint': fp, 'outputs': outputs}
+
+
+def load_state():
+    if os.path.exists(STATE_PATH):
+        with open(STATE_PATH) as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state):
+    tmp_path = STATE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def run_pipeline(stages, force=(), workers=2):
+    """Runs the stage graph, starting each stage once its dependencies succeed."""
+    state = load_state()
+    results = {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while len(results) < len(stages):
+            for name, stage in stages.items():
+                if name in results or name in running:
+                    continue
+                dep_status = [results.get(d, (None,))[0] for d in stage['deps']]
+                if any(s == 'failed' or s == 'blocked' for s in dep_status):
+                    results[name] = ('blocked', 0.0)
+                elif all(s in ('ran', 'skipped') for s in dep_status):
+                    running[name] = pool.submit(run_stage, name, stage, state.get(name, {}), name in force)
+            if not running:
+                continue
+            done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+            for name in [n for n, f in running.items() if f in done]:
+                status, elapsed, record = running.pop(name).result()
+                results[name] = (status, elapsed)
+                if status == 'failed':
+                    state.pop(name, None)
+                else:
+                    state[name] = record
+                save_state(state)
+    return results
+
+
+def print_report(results, total):
+    print(f"\n{'stage':<10} {'status':<8} {'seconds':>8}")
+    for name, (status, elapsed) in results.items():
+        print(f"{name:<10} {status:<8} {elapsed:>8.2f}")
+    print(f"{'total':<10} {'':<8} {total:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild pipeline stages whose inputs changed.")
+    parser.add_argument("--fetch", action="store_true", help="Include the FastF1 fetch stage.")
+    parser.add_argument("--start", type=int, default=2023)
+    parser.add_argument("--end", type=int, default=2024)
+    parser.add_argument("--source", choices=["fastf1", "local"], default="fastf1")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent session loads when fetching.")
+    parser.add_argument("--windows", type=int, nargs="+", default=[3])
+    parser.add_argument("--force", nargs="*", default=[], help="Stages to rerun regardless of the cache.")
+    parser.add_argument("--jobs", type=int, default=2, help="Stages allowed to run at once.")
+    args = parser.parse_args()
+
+    stages = build_stages(args)
+    if not args.fetch:
+        del stages['fetch']
+
+    started = time.perf_counter()
+    results = run_pipeline(stages, force=set(args.force), workers=args.jobs)
+    print_report(results, time.perf_counter() - started)
+    sys.exit(1 if any(status in ('failed', 'blocked') for status, _ in results.values()) else 0)
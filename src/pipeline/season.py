@@ -0,0 +1,77 @@
+import pandas as pd
+
+# Season-calendar predictions: every conventional round of one or more
+# seasons, scored for one grid and yielded a few rounds at a time so a
+# response can be streamed without holding the whole run in memory.
+
+CALENDAR_COLUMNS = ['year', 'RoundNumber', 'EventName', 'Location', 'EventDate', 'EventFormat']
+GRID_SIZE = 20
+
+
+def load_calendar(races_path):
+    """Conventional race weekends from races.csv, in (year, round) order."""
+    races = pd.read_csv(races_path, usecols=CALENDAR_COLUMNS)
+    races = races[races['EventFormat'] == 'conventional'].drop(columns=['EventFormat'])
+    races = races.rename(columns={'RoundNumber': 'round'}).sort_values(['year', 'round'])
+    return races.reset_index(drop=True)
+
+
+def projected_grid(predictor, size=GRID_SIZE):
+    """
+    A starting grid from the latest season in the feature history: the
+    `size` drivers with the most starts that season, in their latest
+    constructor, ordered by recent form (average finishing position).
+    """
+    history = predictor.history_df
+    latest = history[history['year'] == history['year'].max()].sort_values('round', kind='stable')
+    lineup = latest.groupby('driverId', observed=True).agg(
+        starts=('round', 'size'),
+        constructorId=('constructorId', 'last'),
+        form=('driver_recent_form', 'last'),
+    )
+    lineup = lineup.sort_values('starts', ascending=False, kind='stable').head(size)
+    lineup = lineup.sort_values('form', kind='stable')
+    return [
+        {'driverId': str(driver), 'constructorId': str(row.constructorId), 'grid': i + 1}
+        for i, (driver, row) in enumerate(lineup.iterrows())
+    ]
+
+
+def season_rounds(calendar, predictor, years, from_round=None):
+    """
+    Calendar rows to predict. By default each season starts after the last
+    round already in the feature history (all rounds once the season is
+    complete); from_round overrides that.
+    """
+    rounds = calendar[calendar['year'].isin(years)]
+    if from_round is not None:
+        return rounds[rounds['round'] >= from_round]
+    history = predictor.history_df
+    played = history.groupby('year', observed=True)['round'].max().to_dict()
+    keep = []
+    for year, season in rounds.groupby('year', sort=True):
+        remaining = season[season['round'] > played.get(year, 0)]
+        keep.append(remaining if len(remaining) else season)
+    return pd.concat(keep) if keep else rounds
+
+
+def iter_season_predictions(predictor, rounds, grid, chunk_rounds=8, point_in_time=False):
+    """
+    Yields one record per round, scoring chunk_rounds rounds per model call.
+    With point_in_time, each round is scored with the stats known before it
+    (rounds past the end of the history get the latest stats).
+    """
+    rows = list(rounds[['year', 'round', 'EventName', 'Location', 'EventDate']].itertuples(index=False))
+    for start in range(0, len(rows), chunk_rounds):
+        chunk = rows[start:start + chunk_rounds]
+        races = [[{**entry, 'Location': r.Location} for entry in grid] for r in chunk]
+        as_of = [(int(r.year), int(r.round)) for r in chunk] if point_in_time else None
+        for r, predictions in zip(chunk, predictor.predict_many(races, as_of)):
+            yield {
+                'year': int(r.year),
+                'round': int(r.round),
+                'EventName': r.EventName,
+                'Location': r.Location,
+                'date': r.EventDate,
+                'predictions': predictions,
+            }
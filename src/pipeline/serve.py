@@ -0,0 +1,110 @@
+"""
+Multi-worker API server that shares the model and feature table.
+
+The parent process binds the listening socket, exports the serving
+feature columns to an Arrow IPC file (in /dev/shm when available) that
+every worker memory-maps read-only, and by default loads and warms up the
+predictor once before forking the workers. Workers still watch the source
+feature file: when it changes, the first to notice writes a new export,
+removes the old one, and each reloads from the new export. Forked workers share the
+imported libraries, the model and the mapped feature pages copy-on-write
+instead of each holding a private copy. With --no-preload, each worker
+loads the model itself after the fork (as `uvicorn --workers` does), still
+mapping the shared feature file.
+
+    python -m src.pipeline.serve --workers 4 [--no-preload] [--port 5000]
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+
+logger = logging.getLogger("f1_serve")
+
+
+def bind_socket(host, port):
+    # An explicit IPPROTO_TCP matters: asyncio only sets TCP_NODELAY on
+    # accepted connections whose proto says TCP, and without it small
+    # responses stall ~40ms on delayed ACKs
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock):
+    import uvicorn
+    config = uvicorn.Config(app, log_level="warning")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(host, port, workers, preload=True, share_features=True):
+    import app as app_module
+    from src.pipeline.predict import shared_feature_export
+
+    sock = bind_socket(host, port)
+    if share_features:
+        # Exported once here so the workers don't all race to write it
+        arrow_path = shared_feature_export(app_module.features_path)
+        app_module.share_features = True
+        logger.info(f"Workers map features from {arrow_path}")
+
+    if preload:
+        app_module.load_predictor()
+        if app_module.predictor is None:
+            sys.exit(f"Preload failed: {app_module.startup['error']}")
+        # Keep the collector from writing to (and so un-sharing) every
+        # object page that already exists when the workers start
+        gc.collect()
+        gc.freeze()
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                run_worker(app_module.app, sock)
+            finally:
+                os._exit(0)
+        children.append(pid)
+    logger.info(f"Serving on http://{host}:{port} with {workers} workers "
+                f"({'preloaded' if preload else 'loading per worker'}): {children}")
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for pid in children:
+        while True:
+            try:
+                os.waitpid(pid, 0)
+                break
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-forking multi-worker API server.")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 5000)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", 4)))
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="Load the model in each worker after forking.")
+    parser.add_argument("--no-shared-features", dest="share_features", action="store_false",
+                        help="Have each worker read the feature file itself.")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.preload, args.share_features)
@@ -0,0 +1,77 @@
+import numpy as np
+
+# Championship points for finishing positions 1-10
+POINTS = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
+
+# Upper bound on the number of random keys held in memory per chunk
+MAX_CHUNK_CELLS = 1 << 21
+
+
+def sample_position_counts(weights, n_simulations, seed=None, chunk_size=None):
+    """
+    Samples finishing orders from a Plackett-Luce model.
+
+    Uses the Gumbel-max trick: sorting log(weights) + Gumbel noise in
+    descending order draws a full Plackett-Luce ranking, so each chunk of
+    simulations is one noise draw and one argsort. Returns an
+    (n_drivers, n_drivers) array where counts[d, p] is how often driver d
+    finished in position p + 1.
+
+    Chunks are drawn from one generator in sequence, so results for a given
+    seed do not depend on the chunk size.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    n = len(weights)
+    counts = np.zeros(n * n, dtype=np.int64)
+    if n == 0 or n_simulations <= 0:
+        return counts.reshape(n, n)
+
+    # Drivers the model gives zero chance still need a (tiny) weight
+    log_w = np.log(np.clip(weights, 1e-12, None))
+    rng = np.random.default_rng(seed)
+    chunk_size = chunk_size or max(1, MAX_CHUNK_CELLS // n)
+    slots = np.arange(n)
+
+    remaining = n_simulations
+    while remaining:
+        size = min(chunk_size, remaining)
+        keys = log_w + rng.gumbel(size=(size, n))
+        order = np.argsort(-keys, axis=1)  # order[s, p] = driver finishing p + 1
+        counts += np.bincount((order * n + slots).ravel(), minlength=n * n)
+        remaining -= size
+    return counts.reshape(n, n)
+
+
+def simulate_race(predictor, race_input, n_simulations=10000, seed=None, chunk_size=None):
+    """
+    Monte Carlo race simulation on top of F1Predictor's win probabilities.
+
+    The model's win probabilities, normalised over the grid, are used as
+    Plackett-Luce strengths. Returns one dict per driver with the simulated
+    win and podium probabilities, expected points and position, and the full
+    finishing-position distribution, sorted by expected points.
+    """
+    probs = predictor.score(race_input)
+    total = probs.sum()
+    weights = probs / total if total > 0 else np.full(len(probs), 1.0 / max(len(probs), 1))
+
+    counts = sample_position_counts(weights, n_simulations, seed=seed, chunk_size=chunk_size)
+    n = len(race_input)
+    n_simulations = max(n_simulations, 1)
+    dist = counts / n_simulations
+    points = np.zeros(n)
+    points[:min(n, len(POINTS))] = POINTS[:n]
+    positions = np.arange(1, n + 1)
+
+    results = []
+    for i, row in enumerate(race_input):
+        results.append({
+            'driverId': row['driverId'],
+            'win_probability': float(dist[i, 0]),
+            'podium_probability': float(counts[i, :3].sum() / n_simulations),
+            'expected_points': float(dist[i] @ points),
+            'expected_position': float(dist[i] @ positions),
+            'position_distribution': dist[i].tolist(),
+        })
+    results.sort(key=lambda x: x['expected_points'], reverse=True)
+    return results
@@ -0,0 +1,130 @@
+import json
+
+import numpy as np
+
+
+def _parse_base_score(value):
+    """base_score is saved as '5E-1' by older XGBoost and '[5E-1]' by newer."""
+    return float(str(value).strip('[]'))
+
+
+class TreeEnsemble:
+    """
+    Pure-NumPy evaluator for a binary:logistic XGBoost model saved with
+    Booster.save_model() in JSON format.
+
+    All trees are flattened into shared node arrays (feature, threshold,
+    children, default direction, leaf value). Prediction walks every
+    (row, tree) pair down one level per step with vectorized gathers, so a
+    whole grid is scored in max_depth array operations and xgboost is not
+    imported at all. Splits follow XGBoost's rules: inputs are compared as
+    float32, `x < threshold` goes left and missing values take the default
+    branch.
+    """
+
+    def __init__(self, feature_names, base_margin, roots, feature, threshold,
+                 left, right, default_left, is_leaf, value, depth):
+        self.feature_names = feature_names
+        self.base_margin = base_margin
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.is_leaf = is_leaf
+        self.value = value
+        self.depth = depth
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path) as f:
+            model = json.load(f)
+        learner = model['learner']
+        objective = learner['objective']['name']
+        if objective != 'binary:logistic':
+            raise ValueError(f"Unsupported objective {objective}")
+
+        base_score = _parse_base_score(learner['learner_model_param']['base_score'])
+        base_margin = float(np.log(base_score / (1 - base_score)))
+
+        trees = learner['gradient_booster']['model']['trees']
+        roots, feature, threshold, left, right = [], [], [], [], []
+        default_left, is_leaf, value = [], [], []
+        depth = 0
+        offset = 0
+        for tree in trees:
+            if any(tree.get('split_type', [])):
+                raise ValueError("Categorical splits are not supported")
+            lc = np.asarray(tree['left_children'], dtype=np.int64)
+            rc = np.asarray(tree['right_children'], dtype=np.int64)
+            leaf = lc == -1
+            cond = np.asarray(tree['split_conditions'], dtype=np.float32)
+
+            roots.append(offset)
+            feature.append(np.where(leaf, 0, tree['split_indices']))
+            threshold.append(np.where(leaf, 0, cond))
+            # Leaves point at themselves so extra walking steps are no-ops
+            self_index = np.arange(len(lc)) + offset
+            left.append(np.where(leaf, self_index, lc + offset))
+            right.append(np.where(leaf, self_index, rc + offset))
+            default_left.append(np.asarray(tree['default_left'], dtype=bool))
+            is_leaf.append(leaf)
+            value.append(np.where(leaf, cond, 0))
+            depth = max(depth, cls._tree_depth(lc, rc))
+            offset += len(lc)
+
+        return cls(
+            feature_names=learner.get('feature_names') or None,
+            base_margin=base_margin,
+            roots=np.asarray(roots, dtype=np.int64),
+            feature=np.concatenate(feature).astype(np.int64),
+            threshold=np.concatenate(threshold).astype(np.float32),
+            left=np.concatenate(left),
+            right=np.concatenate(right),
+            default_left=np.concatenate(default_left),
+            is_leaf=np.concatenate(is_leaf),
+            value=np.concatenate(value).astype(np.float32),
+            depth=depth,
+        )
+
+    @staticmethod
+    def _tree_depth(lc, rc):
+        depth, frontier = 0, [0]
+        while True:
+            frontier = [c for n in frontier for c in (lc[n], rc[n]) if c != -1]
+            if not frontier:
+                return depth
+            depth += 1
+
+    def predict_margin(self, X):
+        if hasattr(X, 'columns'):
+            if self.feature_names is not None and list(X.columns) != self.feature_names:
+                X = X[self.feature_names]
+            X = X.to_numpy(dtype=np.float32)
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n, n_features = X.shape
+        flat = X.ravel()
+        row_offset = (np.arange(n) * n_features)[:, None]
+        has_missing = np.isnan(flat).any()
+
+        node = np.broadcast_to(self.roots, (n, len(self.roots)))
+        for _ in range(self.depth):
+            x = flat.take(row_offset + self.feature.take(node))
+            go_left = x < self.threshold.take(node)
+            if has_missing:
+                go_left |= np.isnan(x) & self.default_left.take(node)
+            node = np.where(go_left, self.left.take(node), self.right.take(node))
+
+        # XGBoost adds trees one by one onto the base margin in float32;
+        # cumsum keeps that order (sum() would pair values up differently)
+        out = np.empty((n, len(self.roots) + 1), dtype=np.float32)
+        out[:, 0] = self.base_margin
+        self.value.take(node, out=out[:, 1:])
+        return np.cumsum(out, axis=1, dtype=np.float32)[:, -1]
+
+    def predict_proba(self, X):
+        """Same shape as XGBClassifier.predict_proba: columns (P(0), P(1))."""
+        margin = self.predict_margin(X)
+        p = np.float32(1.0) / (np.float32(1.0) + np.exp(-margin))
+        return np.column_stack([np.float32(1.0) - p, p])